@@ -1,6 +1,6 @@
 import React, { useState, useRef, useEffect } from 'react';
 import { Send, Loader2, Code, Play, AlertCircle, Sparkles, Video, Menu } from 'lucide-react';
-import { sendPrompt } from './api';
+import { sendPromptStream } from './api';
 import BurgerMenu from './components/BurgerMenu';
 import VideoEditor from './components/VideoEditor';
 
@@ -15,6 +15,8 @@ function App() {
   const [videoEditorOpen, setVideoEditorOpen] = useState(false);
   const [selectedVideos, setSelectedVideos] = useState([]);
   const [videos, setVideos] = useState([]);
+  const [partialCode, setPartialCode] = useState('');
+  const [progress, setProgress] = useState(null);
 
   const burgerMenuRef = useRef();
   const burgerButtonRef = useRef();
@@ -33,9 +35,32 @@ function App() {
     setIsLoading(true);
     setError(null);
     setResult(null);
+    setPartialCode('');
+    setProgress(null);
+
+    const onEvent = (event) => {
+      switch (event.type) {
+        case 'step':
+          setProgress(`Step ${event.step}: ${event.reasoning}`);
+          break;
+        case 'attempt':
+          // a rejected attempt's code is discarded; start over
+          setPartialCode('');
+          if (event.attempt > 1) setProgress(`Retrying code generation (attempt ${event.attempt})`);
+          break;
+        case 'code':
+          setPartialCode((code) => code + event.text);
+          break;
+        case 'rejected':
+          console.warn('⚠️ Generated code rejected:', event.reason);
+          break;
+        default:
+          break;
+      }
+    };
 
     try {
-      const data = await sendPrompt(prompt);
+      const data = await sendPromptStream(prompt, { onEvent });
       console.log('📥 Received response:', data);
       setResult(data);
 
@@ -50,6 +75,8 @@ function App() {
       setError(err.message);
     } finally {
       setIsLoading(false);
+      setPartialCode('');
+      setProgress(null);
     }
   };
 
@@ -168,7 +195,6 @@ function App() {
             .map((id) => videos.find((v) => v.id === id))
             .filter(Boolean)}
           videos={videos}
-          onVideosUpdate={handleVideosUpdate}
         />
       )}
 
@@ -243,6 +269,20 @@ function App() {
             </div>
           )}
 
+          {isLoading && (progress || partialCode) && (
+            <div className="mb-8 bg-gray-800/50 backdrop-blur-md rounded-xl border border-gray-700/50 overflow-hidden">
+              <div className="flex items-center space-x-2 p-4 border-b border-gray-700/50">
+                <Loader2 className="w-5 h-5 text-cyan-400 animate-spin" />
+                <h3 className="text-cyan-300 font-medium">{progress || 'Generating code...'}</h3>
+              </div>
+              {partialCode && (
+                <pre className="p-4 overflow-x-auto text-sm">
+                  <code className="text-gray-400">{partialCode}</code>
+                </pre>
+              )}
+            </div>
+          )}
+
           {result && (
             <div className="space-y-6">
               {result.intelligent_selection && (
@@ -40,6 +40,45 @@ export async function sendPrompt(prompt) {
   return result;
 }
 
+// Same as sendPrompt, but reads /generate/stream (NDJSON) and reports progress
+// while it runs: onEvent gets `step`, `attempt`, `code` and `rejected` events.
+// `code` events carry validated lines of the scene as the model writes them;
+// an `attempt` event means earlier partial code was discarded.
+export async function sendPromptStream(prompt, { onEvent } = {}) {
+  const res = await fetch(`${API_BASE_URL}/generate/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ prompt }),
+  });
+
+  if (!res.ok) {
+    const err = await res.json().catch(() => null);
+    throw new Error(err?.error || `HTTP ${res.status}: ${res.statusText}`);
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+    const lines = buffer.split('\n');
+    buffer = lines.pop();
+    for (const line of lines) {
+      if (!line.trim()) continue;
+      const event = JSON.parse(line);
+      if (event.type === 'error') throw new Error(event.error);
+      if (event.type === 'result') {
+        const { type, ...data } = event;
+        return { ...data, intelligent_selection: true };
+      }
+      onEvent?.(event);
+    }
+    if (done) break;
+  }
+  throw new Error('Stream ended without a result');
+}
+
 // Legacy function for backward compatibility
 export async function sendPromptLegacy(prompt) {
   const res = await fetch(`${API_BASE_URL}/generate/legacy`, {
@@ -81,6 +120,24 @@ export const getVideos = async () => {
   return res.json();
 };
 
+// Live video library: one full `sync` on connect (or when the cursor is stale),
+// then incremental `change` events. EventSource resends the last cursor as
+// Last-Event-ID when it reconnects, so only missed changes are replayed.
+export const subscribeVideoFeed = ({ onOpen, onSync, onChange, onError } = {}) => {
+  const source = new EventSource(`${API_BASE_URL}/videos/events`);
+  source.onopen = (e) => onOpen?.(e);
+  source.addEventListener('sync', (e) => onSync?.(JSON.parse(e.data)));
+  source.addEventListener('change', (e) => onChange?.(JSON.parse(e.data)));
+  source.onerror = (e) => onError?.(e);
+  return () => source.close();
+};
+
+// Apply one change event to a video list (idempotent)
+export const applyVideoChange = (videos, change) => {
+  const rest = videos.filter(v => v.id !== change.video.id);
+  return change.type === 'deleted' ? rest : [...rest, change.video];
+};
+
 export const deleteVideo = async (id) => {
   const res = await fetch(`${API_BASE_URL}/videos/${id}.mp4`, { method: 'DELETE' });
   if (!res.ok) {
@@ -99,6 +156,22 @@ export const deleteAllVideos = async () => {
   return res.text();
 };
 
+// Still frame shown at `t` seconds (JPEG), for previews and edit points
+export const frameUrl = (id, t, width) =>
+  `${API_BASE_URL}/videos/${id}/frame?t=${t.toFixed(3)}${width ? `&w=${width}` : ''}`;
+
+// Several frames in one request: [{ t, time, image }] with data-URI images
+export const getFrames = async (id, times, width) => {
+  const params = new URLSearchParams({ t: times.map(t => t.toFixed(3)).join(',') });
+  if (width) params.set('w', width);
+  const res = await fetch(`${API_BASE_URL}/videos/${id}/frame?${params}`);
+  if (!res.ok) {
+    const errorData = await res.json().catch(() => null);
+    throw new Error(errorData?.error || 'Failed to fetch frames');
+  }
+  return (await res.json()).frames;
+};
+
 export const trimVideo = async (id, startTime, endTime) => {
   const res = await fetch(`${API_BASE_URL}/videos/${id}/trim`, {
     method: 'POST',
@@ -136,6 +209,36 @@ export const mergeVideos = async (videoIds) => {
   return res.json(); // { video_url: "/videos/merged.mp4", merged_id: "uuid" }
 };
 
+// Non-destructive edits: clips = [{ source, in, out }] where source is a video or edit id.
+// Edits are pinned to the source files they were cut from: after a source is
+// trimmed in place, playing, exporting or re-editing them fails with HTTP 409.
+// Nothing is encoded until the edit is played via its video_url or exported.
+export const createEdit = async (clips) => {
+  const res = await fetch(`${API_BASE_URL}/edits`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ clips }),
+  });
+
+  if (!res.ok) {
+    const errorData = await res.json().catch(() => null);
+    throw new Error(errorData?.error || `HTTP ${res.status}: Failed to create edit`);
+  }
+
+  return res.json(); // { id, clips, duration, video_url, preview, materialized }
+};
+
+export const exportEdit = async (editId) => {
+  const res = await fetch(`${API_BASE_URL}/edits/${editId}/export`, { method: 'POST' });
+
+  if (!res.ok) {
+    const errorData = await res.json().catch(() => null);
+    throw new Error(errorData?.error || `HTTP ${res.status}: Failed to export edit`);
+  }
+
+  return res.json(); // { video_url, video_id }
+};
+
 // UI Action handlers
 export const handleUIActions = (uiActions, callbacks = {}) => {
   if (!Array.isArray(uiActions) || uiActions.length === 0) {
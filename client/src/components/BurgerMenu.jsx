@@ -1,6 +1,6 @@
-import React, { useState, useEffect, forwardRef, useImperativeHandle } from 'react';
+import React, { useState, useEffect, useRef, forwardRef, useImperativeHandle } from 'react';
 import { Menu, X, Film, Trash2, Edit, Download, Loader } from 'lucide-react';
-import { getVideos, deleteVideo, deleteAllVideos } from '../api';
+import { getVideos, deleteVideo, deleteAllVideos, subscribeVideoFeed, applyVideoChange } from '../api';
 
 const API_BASE_URL = 'http://localhost:5000';
 
@@ -17,6 +17,8 @@ const BurgerMenu = forwardRef((props, ref) => {
   const [videos, setVideos] = useState([]);
   const [selectedVideos, setSelectedVideos] = useState([]);
   const [loading, setLoading] = useState(false);
+  // True while the change feed is connected and has delivered a full sync
+  const feedLive = useRef(false);
 
   // Use controlled state if provided, otherwise use internal state
   const isOpen = controlledIsOpen !== undefined ? controlledIsOpen : internalIsOpen;
@@ -37,7 +39,41 @@ const BurgerMenu = forwardRef((props, ref) => {
     }
   }));
 
+  // Keep the library in sync from the server's change feed instead of
+  // refetching the whole list every time the menu opens.
+  useEffect(() => {
+    const unsubscribe = subscribeVideoFeed({
+      // A reconnect resumes from the last cursor, so missed changes are replayed
+      onOpen: () => {
+        feedLive.current = true;
+      },
+      onSync: ({ videos: videoList }) => {
+        feedLive.current = true;
+        setVideos(videoList);
+        onVideosUpdate(videoList);
+      },
+      onChange: (change) => {
+        setVideos(prev => {
+          const next = applyVideoChange(prev, change);
+          onVideosUpdate(next);
+          return next;
+        });
+        if (change.type === 'deleted') {
+          setSelectedVideos(prev => prev.filter(id => id !== change.video.id));
+        }
+      },
+      onError: () => {
+        feedLive.current = false;
+      },
+    });
+    return unsubscribe;
+  }, []);
+
   const fetchVideos = async () => {
+    // The feed already pushed every change; only fall back to a full fetch when it is down
+    if (feedLive.current) {
+      return;
+    }
     setLoading(true);
     try {
       const videoList = await getVideos();
@@ -72,7 +108,7 @@ const BurgerMenu = forwardRef((props, ref) => {
       await Promise.all(selectedVideos.map(deleteVideo));
       setSelectedVideos([]);
       onVideoSelect([]);
-      await fetchVideos();
+      await fetchVideos();  // no-op while the change feed is live
     } catch (err) {
       console.error('Failed to delete selected videos:', err);
     } finally {
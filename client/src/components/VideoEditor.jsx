@@ -10,16 +10,40 @@ import {
   Download,
   CheckCircle,
 } from 'lucide-react';
-import { trimVideo, mergeVideos } from '../api';
+import { createEdit, exportEdit, frameUrl, getFrames } from '../api';
 
 const API_BASE_URL = 'http://localhost:5000';
 
+// A single-clip edit previews straight from its source via a media fragment,
+// so trims play back immediately without any encode.
+const previewClip = (video) =>
+  video?.edit && video.edit.preview.length === 1 ? video.edit.preview[0] : null;
+
+const videoSrc = (video) => {
+  const clip = previewClip(video);
+  if (clip) return `${API_BASE_URL}${clip.url}#t=${clip.in},${clip.out}`;
+  if (video?.edit) return `${API_BASE_URL}${video.edit.video_url}`;
+  return `${API_BASE_URL}${video.url}?t=${Date.now()}`;
+};
+
+// Video whose frames the timeline shows: the video itself, or the source of a
+// single-clip edit (its timeline is the source's). Multi-clip edits have none.
+const frameSourceId = (video) => {
+  const clip = previewClip(video);
+  if (clip) return clip.url.split('/').pop().replace(/\.mp4$/, '');
+  return video && !video.edit ? video.id : null;
+};
+
+const FILMSTRIP_FRAMES = 10;
+
+// Clip reference for a sequence item: the original video or its current edit
+const clipSource = (video) => (video.edit ? { source: video.edit.id } : { source: video.id });
+
 export default function VideoEditor({ 
   isOpen = false, 
   onClose, 
   selectedVideos = [], 
-  videos = [], 
-  onVideosUpdate 
+  videos = []
 }) {
   const [currentVideo, setCurrentVideo] = useState(null);
   const [sequence, setSequence] = useState([]);
@@ -32,6 +56,7 @@ export default function VideoEditor({
   const [mergedUrl, setMergedUrl] = useState('');
   const [mergedId, setMergedId] = useState('');
   const [successMessage, setSuccessMessage] = useState('');
+  const [filmstrip, setFilmstrip] = useState([]);
   const videoRef = useRef(null);
 
   // Initialize sequence and selected video when component opens
@@ -79,8 +104,7 @@ export default function VideoEditor({
   useEffect(() => {
     if (currentVideo && videoRef.current && isOpen) {
       console.log('Loading video:', currentVideo);
-      const cacheBustedUrl = `${API_BASE_URL}${currentVideo.url}?t=${Date.now()}`;
-      videoRef.current.src = cacheBustedUrl;
+      videoRef.current.src = videoSrc(currentVideo);
       videoRef.current.load();
       setMergedUrl('');
       setMergedId('');
@@ -88,6 +112,19 @@ export default function VideoEditor({
     }
   }, [currentVideo, isOpen]);
 
+  // Filmstrip along the timeline, fetched as one batch of server-side frames
+  useEffect(() => {
+    const id = frameSourceId(currentVideo);
+    setFilmstrip([]);
+    if (!isOpen || !id || duration <= 0) return;
+    let cancelled = false;
+    const times = Array.from({ length: FILMSTRIP_FRAMES }, (_, i) => (i + 0.5) * duration / FILMSTRIP_FRAMES);
+    getFrames(id, times, 160)
+      .then(frames => { if (!cancelled) setFilmstrip(frames); })
+      .catch(err => console.warn('Filmstrip unavailable:', err));
+    return () => { cancelled = true; };
+  }, [currentVideo, duration, isOpen]);
+
   const fmt = t => {
     const m = Math.floor(t/60),
           s = String(Math.floor(t%60)).padStart(2,'0');
@@ -97,9 +134,10 @@ export default function VideoEditor({
   const onMeta = () => {
     if (videoRef.current) {
       const d = videoRef.current.duration;
+      const clip = previewClip(currentVideo);
       setDuration(d);
-      setTrimEnd(d);
-      setTrimStart(0);
+      setTrimStart(clip ? clip.in : 0);
+      setTrimEnd(clip ? clip.out : d);
     }
   };
 
@@ -160,21 +198,19 @@ export default function VideoEditor({
     setSuccessMessage('');
     
     try {
-      const result = await trimVideo(currentVideo.id, trimStart, trimEnd);
-      
-      // Show success message
-      setSuccessMessage('Video trimmed successfully! The original video has been replaced.');
+      // Single-clip previews are in source time, so trim the source directly;
+      // otherwise trim the edit's own timeline and let the server collapse it.
+      const clip = previewClip(currentVideo);
+      const edit = await createEdit([{
+        source: clip ? currentVideo.edit.clips[0].source : clipSource(currentVideo).source,
+        in: trimStart,
+        out: trimEnd,
+      }]);
       
-      // Since we're replacing the original video, the ID stays the same
-      // but we need to reload the video player
-      const updatedVideo = {
-        ...currentVideo,
-        url: result.video_url
-      };
+      setSuccessMessage('Trim applied without re-encoding. Export it to save a new video; the original is kept.');
       
+      const updatedVideo = { ...currentVideo, edit };
       setCurrentVideo(updatedVideo);
-      
-      // Update sequence with the same video object (ID unchanged)
       setSequence(prevSeq => 
         prevSeq.map(v => v.id === currentVideo.id ? updatedVideo : v)
       );
@@ -182,22 +218,8 @@ export default function VideoEditor({
       // Reset player state
       setCurrentTime(0);
       setDuration(0);
-      setTrimStart(0);
-      setTrimEnd(0);
       setIsPlaying(false);
       
-      // Force video reload
-      if (videoRef.current) {
-        const cacheBustedUrl = `${API_BASE_URL}${result.video_url}?t=${Date.now()}`;
-        videoRef.current.src = cacheBustedUrl;
-        videoRef.current.load();
-      }
-      
-      // Update the parent component's video list
-      if (onVideosUpdate) {
-        await onVideosUpdate();
-      }
-      
       // Clear success message after 3 seconds
       setTimeout(() => setSuccessMessage(''), 3000);
       
@@ -209,21 +231,33 @@ export default function VideoEditor({
     }
   };
 
+  const doExport = async () => {
+    if (!currentVideo?.edit) return;
+    setProcessing(true);
+    setSuccessMessage('');
+
+    try {
+      await exportEdit(currentVideo.edit.id);
+      setSuccessMessage('Edited video exported to your library.');
+      setTimeout(() => setSuccessMessage(''), 3000);
+    } catch (error) {
+      console.error('Export failed:', error);
+      alert(`Export failed: ${error.message || 'Unknown error'}`);
+    } finally {
+      setProcessing(false);
+    }
+  };
+
   const doMerge = async () => {
     if (sequence.length < 2) return;
     setProcessing(true);
     setSuccessMessage('');
     
     try {
-      const result = await mergeVideos(sequence.map(v => v.id));
-      setMergedUrl(result.video_url);
-      setMergedId(result.merged_id || '');
-      setSuccessMessage('Videos merged successfully! Click the download button to save the merged video.');
-      
-      // Update the parent component's video list to include the new merged video
-      if (onVideosUpdate) {
-        await onVideosUpdate();
-      }
+      const edit = await createEdit(sequence.map(clipSource));
+      setMergedUrl(edit.video_url);
+      setMergedId(edit.id);
+      setSuccessMessage('Merge ready! It is rendered once on first download or export.');
       
       // Clear success message after 5 seconds
       setTimeout(() => setSuccessMessage(''), 5000);
@@ -242,6 +276,21 @@ export default function VideoEditor({
     }
   };
 
+  const exportMergedVideo = async () => {
+    if (!mergedId) return;
+    setProcessing(true);
+    try {
+      await exportEdit(mergedId);
+      setSuccessMessage('Merged video saved to your library.');
+      setTimeout(() => setSuccessMessage(''), 5000);
+    } catch (error) {
+      console.error('Export failed:', error);
+      alert(`Export failed: ${error.message || 'Unknown error'}`);
+    } finally {
+      setProcessing(false);
+    }
+  };
+
   const downloadMergedVideo = () => {
     if (mergedUrl) {
       const link = document.createElement('a');
@@ -349,6 +398,21 @@ export default function VideoEditor({
                     </div>
                   </div>
 
+                  {/* Filmstrip */}
+                  {filmstrip.length > 0 && (
+                    <div className="flex gap-1 overflow-hidden rounded-lg">
+                      {filmstrip.map(frame => (
+                        <img
+                          key={frame.t}
+                          src={frame.image}
+                          alt={fmt(frame.time)}
+                          onClick={() => seekTo(frame.time)}
+                          className="flex-1 min-w-0 cursor-pointer opacity-80 hover:opacity-100 transition-opacity"
+                        />
+                      ))}
+                    </div>
+                  )}
+
                   {/* Timeline */}
                   <div
                     className="relative h-2 bg-gray-700 rounded-full cursor-pointer"
@@ -367,33 +431,47 @@ export default function VideoEditor({
 
                   {/* Trim Controls */}
                   <div className="bg-gray-800/50 rounded-xl p-4">
-                    <h4 className="text-purple-300 font-semibold mb-3">Trim Video (Replaces Original)</h4>
+                    <h4 className="text-purple-300 font-semibold mb-3">Trim Video (Original Is Kept)</h4>
                     <div className="grid grid-cols-2 gap-4 mb-4">
                       <div>
                         <label className="text-gray-300 text-sm">Start Time</label>
                         <input
                           type="range"
-                          min="0" 
-                          max={duration || 0} 
+                          min={previewClip(currentVideo)?.in ?? 0}
+                          max={previewClip(currentVideo)?.out ?? (duration || 0)}
                           step="0.1"
                           value={trimStart}
                           onChange={e=>setTrimStart(+e.target.value)}
                           className="w-full accent-purple-500"
                         />
                         <div className="text-gray-400 text-xs">{fmt(trimStart)}</div>
+                        {frameSourceId(currentVideo) && (
+                          <img
+                            src={frameUrl(frameSourceId(currentVideo), trimStart, 240)}
+                            alt={`Frame at ${fmt(trimStart)}`}
+                            className="mt-2 w-full rounded bg-black"
+                          />
+                        )}
                       </div>
                       <div>
                         <label className="text-gray-300 text-sm">End Time</label>
                         <input
                           type="range"
                           min={trimStart} 
-                          max={duration || 0} 
+                          max={previewClip(currentVideo)?.out ?? (duration || 0)}
                           step="0.1"
                           value={trimEnd}
                           onChange={e=>setTrimEnd(+e.target.value)}
                           className="w-full accent-purple-500"
                         />
                         <div className="text-gray-400 text-xs">{fmt(trimEnd)}</div>
+                        {frameSourceId(currentVideo) && (
+                          <img
+                            src={frameUrl(frameSourceId(currentVideo), trimEnd, 240)}
+                            alt={`Frame at ${fmt(trimEnd)}`}
+                            className="mt-2 w-full rounded bg-black"
+                          />
+                        )}
                       </div>
                     </div>
                     <div className="flex items-center gap-4 mb-3">
@@ -416,8 +494,18 @@ export default function VideoEditor({
                       className="w-full px-4 py-2 bg-purple-500/20 hover:bg-purple-500/30 border border-purple-500/30 rounded-lg text-purple-300 disabled:opacity-50 flex items-center justify-center transition-colors"
                     >
                       <Scissors className="w-4 h-4 mr-2"/> 
-                      {processing ? 'Trimming...' : 'Trim & Replace Original'}
+                      {processing ? 'Trimming...' : 'Apply Trim'}
                     </button>
+                    {currentVideo.edit && (
+                      <button
+                        onClick={doExport}
+                        disabled={processing}
+                        className="w-full mt-3 px-4 py-2 bg-cyan-500/20 hover:bg-cyan-500/30 border border-cyan-500/30 rounded-lg text-cyan-300 disabled:opacity-50 flex items-center justify-center transition-colors"
+                      >
+                        <Download className="w-4 h-4 mr-2"/>
+                        {processing ? 'Exporting...' : 'Export Edited Video'}
+                      </button>
+                    )}
                   </div>
                 </div>
               </>
@@ -445,6 +533,15 @@ export default function VideoEditor({
                 <Download className="w-4 h-4 mr-2"/> Download Merged Video
               </button>
             )}
+            {mergedId && (
+              <button
+                onClick={exportMergedVideo}
+                disabled={processing}
+                className="mb-4 px-4 py-2 bg-cyan-500/20 hover:bg-cyan-500/30 border border-cyan-500/30 rounded-lg text-cyan-300 disabled:opacity-50 flex items-center justify-center transition-colors"
+              >
+                <CheckCircle className="w-4 h-4 mr-2"/> Save Merge to Library
+              </button>
+            )}
 
             {/* Video Sequence List */}
             <h4 className="text-gray-300 font-semibold mb-3">Video Sequence ({sequence.length})</h4>
@@ -491,7 +588,7 @@ export default function VideoEditor({
                     </div>
                   </div>
                   <video
-                    src={`${API_BASE_URL}${v.url}?t=${Date.now()}`}
+                    src={videoSrc(v)}
                     className="w-full h-16 object-cover rounded bg-black border border-gray-600"
                     muted
                     playsInline
@@ -1,20 +1,33 @@
 import os
 import uuid
 import json
+import math
+import base64
 import logging
 from datetime import datetime
 from pathlib import Path
-from moviepy import VideoFileClip, concatenate_videoclips
 import shutil
 
-from flask import Flask, request, jsonify, send_from_directory
+from utils.config import load_config, configure_logging, start_warmup
+
+# Load .env before importing modules that read settings at import time
+load_config()
+
+from flask import Flask, request, jsonify, send_from_directory, Response, stream_with_context
 from flask_cors import CORS
 import requests
-from dotenv import load_dotenv
+from utils import encode, editing
+from utils.batch import run_batch, MAX_BATCH_SIZE
+from utils.edl import EDLStore, EDLError, StaleEDLError, flatten, is_edl_id, stale_sources
+from utils.singleflight import SingleFlight
+from utils.hls import hls_url, remove_hls, schedule_packaging, serving_dir
+from utils.encode import probe
+from utils.editing import run_encode, video_lock, VideoBusyError
+from utils.feed import ChangeFeed
+from utils.frames import FrameServer, FRAME_MAX_BATCH
 
 # ─── Setup ─────────────────────────────────────────────────────────────────────
-load_dotenv()
-logging.basicConfig(level=logging.DEBUG)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__, static_folder=None)
@@ -32,6 +45,27 @@ HEADERS = {
 VIDEO_DIR = Path(__file__).parent / "videos"
 VIDEO_DIR.mkdir(exist_ok=True)
 
+# Non-destructive edits (EDLs) and their lazily materialized MP4s
+EDIT_DIR = Path(__file__).parent / "edits"
+edl_store = EDLStore(EDIT_DIR)
+_materializing = SingleFlight("edl")
+
+# Library change feed streamed to clients from /videos/events
+video_feed = ChangeFeed()
+
+# Still frames for scrubbing and picking edit points (/videos/<id>/frame)
+frame_server = FrameServer()
+FEED_HEARTBEAT_SECONDS = 15
+
+def _tool_result(data):
+    for item in data.get("result",{}).get("content",[]):
+        if item.get("type")=="text":
+            try:
+                return json.loads(item["text"])
+            except:
+                return {"text": item["text"]}
+    return {}
+
 def call_mcp(tool_name, arguments, timeout=300):
     rpc = {
         "jsonrpc": "2.0",
@@ -49,42 +83,59 @@ def call_mcp(tool_name, arguments, timeout=300):
     else:
         data = resp.json()
     
-    for item in data.get("result",{}).get("content",[]):
-        if item.get("type")=="text":
-            try:
-                return json.loads(item["text"])
-            except:
-                return {"text": item["text"]}
-    return {}
+    return _tool_result(data)
+
+def call_mcp_stream(tool_name, arguments, timeout=300):
+    """
+    Like call_mcp, but asks for progress notifications and yields each
+    progress event as it arrives, then ``{"type": "result", "result": ...}``.
+    """
+    rpc_id = str(uuid.uuid4())
+    rpc = {
+        "jsonrpc": "2.0",
+        "id": rpc_id,
+        "method": "tools/call",
+        "params": {"name": tool_name, "arguments": arguments, "_meta": {"progressToken": rpc_id}}
+    }
+    logger.debug("MCP streaming call %s args=%s", tool_name, arguments)
+    with requests.post(MCP_URL, json=rpc, headers=HEADERS, timeout=timeout, stream=True) as resp:
+        resp.raise_for_status()
+        if not resp.headers.get("Content-Type","").startswith("text/event-stream"):
+            yield {"type": "result", "result": _tool_result(resp.json())}
+            return
+        for line in resp.iter_lines():
+            if not line.startswith(b"data:"):
+                continue
+            message = json.loads(line[5:].decode("utf-8"))
+            if message.get("method") == "notifications/progress":
+                event = message.get("params", {}).get("message")
+                if event:
+                    yield json.loads(event)
+            elif message.get("id") == rpc_id:
+                if "error" in message:
+                    raise RuntimeError(message["error"].get("message", "MCP error"))
+                yield {"type": "result", "result": _tool_result(message)}
+                return
+    raise RuntimeError("MCP stream ended without a result")
 
 # Local video processing functions
+# Re-encodes go through utils.encode (chunked at keyframes, encoded in
+# parallel, concatenated without a second encode) on the edit worker pool
+# from utils.editing, each job in its own scratch directory.
 def trim_video_file(input_path, output_path, start_time, end_time):
     """Trim video file and return the output path"""
     try:
-        with VideoFileClip(str(input_path)) as clip:
-            if end_time is None or end_time <= 0 or end_time > clip.duration:
-                end_time = clip.duration
-            
-            # Ensure start_time is valid
-            if start_time < 0:
-                start_time = 0
-            if start_time >= end_time:
-                raise ValueError("Start time must be less than end time")
-                
-            # Use subclipped instead of subclip (correct method name)
-            trimmed = clip.subclipped(start_time, end_time)
+        duration = probe(input_path)["duration"]
+        if end_time is None or end_time <= 0 or end_time > duration:
+            end_time = duration
+        
+        # Ensure start_time is valid
+        if start_time < 0:
+            start_time = 0
+        if start_time >= end_time:
+            raise ValueError("Start time must be less than end time")
             
-            # Write with proper settings
-            trimmed.write_videofile(
-                str(output_path),
-                codec='libx264',
-                audio_codec='aac',
-                logger=None,
-                temp_audiofile='temp-audio.m4a',
-                remove_temp=True
-            )
-            trimmed.close()
-        return output_path
+        return run_encode([(input_path, start_time, end_time)], output_path)
     except Exception as e:
         logger.error(f"Error trimming video: {e}")
         raise
@@ -92,37 +143,98 @@ def trim_video_file(input_path, output_path, start_time, end_time):
 def merge_video_files(input_paths, output_path):
     """Merge multiple video files into one"""
     try:
-        clips = []
         for path in input_paths:
             if not Path(path).exists():
                 raise FileNotFoundError(f"Video file not found: {path}")
-            clips.append(VideoFileClip(str(path)))
         
-        if not clips:
+        if not input_paths:
             raise ValueError("No valid video clips to merge")
             
-        final_clip = concatenate_videoclips(clips)
-        
-        # Write with proper settings - removed verbose parameter
-        final_clip.write_videofile(
-            str(output_path),
-            codec='libx264',
-            audio_codec='aac',
-            logger=None,
-            temp_audiofile='temp-audio.m4a',
-            remove_temp=True
-        )
-        
-        # Clean up clips
-        final_clip.close()
-        for clip in clips:
-            clip.close()
-            
-        return output_path
+        return run_encode([(path, 0, None) for path in input_paths], output_path)
     except Exception as e:
         logger.error(f"Error merging videos: {e}")
         raise
 
+def probe_duration(video_id):
+    """Duration in seconds of a library video, or None if it doesn't exist"""
+    path = VIDEO_DIR / f"{video_id}.mp4"
+    if not path.exists():
+        return None
+    return probe(path)["duration"]
+
+def source_version(video_id):
+    """Token that changes whenever a library video is rewritten (e.g. trimmed in place)"""
+    try:
+        st = (VIDEO_DIR / f"{video_id}.mp4").stat()
+    except FileNotFoundError:
+        return None
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+def check_fresh(edl):
+    """Raise StaleEDLError if a source changed since the EDL was created"""
+    stale = stale_sources(edl, source_version)
+    if stale:
+        raise StaleEDLError(f"Source video(s) changed since this edit was created: {', '.join(stale)}")
+
+def render_edl_file(clips, output_path):
+    """Encode a flattened EDL (original sources + in/out points) into one MP4"""
+    segments = []
+    for c in clips:
+        path = VIDEO_DIR / f"{c['source']}.mp4"
+        if not path.exists():
+            raise FileNotFoundError(f"Video file not found: {path}")
+        segments.append((path, c["in"], c["out"]))
+    return run_encode(segments, output_path)
+
+def materialize_edl(edl):
+    """Return the cached MP4 for an EDL, encoding it on first use"""
+    check_fresh(edl)
+    cached = edl_store.cached(edl["id"])
+    if cached:
+        return cached
+
+    def _encode():
+        final = edl_store.cache_path(edl["id"])
+        if os.path.exists(final):
+            return final
+        logger.info("Materializing edit %s (%d clips)", edl["id"], len(edl["clips"]))
+        render_edl_file(edl["clips"], final)  # atomic: written to a temp file, then renamed
+        try:
+            check_fresh(edl)  # a source may have been trimmed while we encoded
+        except StaleEDLError:
+            os.unlink(final)
+            raise
+        edl_store.prune()
+        return final
+
+    path, _ = _materializing.do(edl["id"], _encode)
+    return path
+
+def video_item(mp4):
+    """Library entry for one MP4 in VIDEO_DIR"""
+    stat = mp4.stat()
+    return {
+        "id":         mp4.stem,
+        "name":       mp4.stem,
+        "url":        f"/videos/{mp4.name}",
+        "hls_url":    hls_url(mp4.stem),
+        "created_at": datetime.fromtimestamp(stat.st_mtime).isoformat(),
+        "duration":   None
+    }
+
+def publish_video(kind, video_url):
+    """Publish a created/updated change for a /videos/<id>.mp4 URL"""
+    if not video_url:
+        return
+    mp4 = VIDEO_DIR / Path(video_url).name
+    try:
+        video_feed.publish(kind, video_item(mp4))
+    except FileNotFoundError:
+        logger.warning("Not publishing %s for missing %s", kind, mp4)
+
+def publish_deleted(video_id):
+    video_feed.publish("deleted", {"id": video_id})
+
 # ─── Routes ────────────────────────────────────────────────────────────────────
 
 @app.route('/')
@@ -143,18 +255,14 @@ def generate():
         
         if "error" in result:
             logger.error("MCP processing failed: %s", result["error"])
+            if result.get("error_type") == "resource_limit":
+                # The generated scene was too expensive to render, not a server fault
+                return jsonify({k: result[k] for k in ("error", "error_type", "limit")}), 422
             return jsonify({"error": result["error"]}), 500
         
-        # Enhanced response with tool selection information AND UI actions
-        response = {
-            "code": result.get("code"),
-            "video_url": result.get("video_url"),
-            "tools_used": result.get("tools_used", []),
-            "reasoning": result.get("reasoning", []),
-            "tool_selection_log": result.get("tool_selection_log", []),
-            "ui_actions": result.get("ui_actions", [])  # ← This was the missing piece!
-        }
-        
+        response = generation_response(result)
+        publish_video("created", response["video_url"])
+
         logger.debug("Flask response with UI actions: %s", {
             **response, 
             "ui_actions_count": len(response["ui_actions"])
@@ -166,6 +274,52 @@ def generate():
         logger.error("Generation failed: %s", e)
         return jsonify({"error": str(e)}), 500
 
+def generation_response(result):
+    """Client-facing fields of a process_request result"""
+    # Enhanced response with tool selection information AND UI actions
+    return {
+        "code": result.get("code"),
+        "video_url": result.get("video_url"),
+        "hls_url": result.get("hls_url"),
+        "tools_used": result.get("tools_used", []),
+        "reasoning": result.get("reasoning", []),
+        "tool_selection_log": result.get("tool_selection_log", []),
+        "ui_actions": result.get("ui_actions", [])  # ← This was the missing piece!
+    }
+
+@app.route('/generate/stream', methods=['POST'])
+def generate_stream():
+    """
+    Same as /generate, streamed as NDJSON: ``step`` events as tools start,
+    ``attempt``/``code``/``rejected`` events while the scene code is being
+    generated, then one ``result`` (the /generate response) or ``error`` line.
+    """
+    body = request.get_json(force=True)
+    prompt = body.get("prompt","").strip()
+    if not prompt:
+        return jsonify({"error":"prompt is empty"}), 400
+
+    def events():
+        try:
+            for event in call_mcp_stream("process_request", {"prompt": prompt}):
+                if event["type"] != "result":
+                    yield json.dumps(event) + "\n"
+                    continue
+                result = event["result"]
+                if "error" in result:
+                    logger.error("MCP processing failed: %s", result["error"])
+                    fields = ("error", "error_type", "limit")
+                    yield json.dumps({"type": "error", **{k: result[k] for k in fields if k in result}}) + "\n"
+                    return
+                response = generation_response(result)
+                publish_video("created", response["video_url"])
+                yield json.dumps({"type": "result", **response}) + "\n"
+        except Exception as e:
+            logger.error("Generation failed: %s", e)
+            yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+
+    return Response(stream_with_context(events()), mimetype="application/x-ndjson")
+
 @app.route('/generate/legacy', methods=['POST'])
 def generate_legacy():
     """Legacy endpoint using direct tool calls (for backward compatibility)"""
@@ -183,11 +337,51 @@ def generate_legacy():
 
     try:
         vid_resp = call_mcp("render_video", {"code": code})
-        return jsonify({"code": code, "video_url": vid_resp["video_url"]})
+        if vid_resp.get("error_type") == "resource_limit":
+            return jsonify({"code": code, **vid_resp}), 422
+        publish_video("created", vid_resp["video_url"])
+        return jsonify({"code": code, "video_url": vid_resp["video_url"], "hls_url": vid_resp.get("hls_url")})
     except Exception as e:
         logger.error("Render failed: %s", e)
         return jsonify({"error": str(e)}), 500
 
+@app.route('/generate/batch', methods=['POST'])
+def generate_batch():
+    """
+    Generate many prompts in one call. Duplicate prompts are processed once,
+    unique ones fan out concurrently, and each result is streamed back as an
+    NDJSON line as soon as it completes, followed by a summary line.
+    """
+    body = request.get_json(force=True)
+    prompts = body.get("prompts", [])
+    if not isinstance(prompts, list):
+        return jsonify({"error": "prompts must be a list"}), 400
+    prompts = [str(p).strip() for p in prompts]
+    if not prompts or not all(prompts):
+        return jsonify({"error": "prompts must be a non-empty list of non-empty strings"}), 400
+    if len(prompts) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"Batch too large: {len(prompts)} prompts (max {MAX_BATCH_SIZE})"}), 400
+
+    max_workers = body.get("maxWorkers")
+    if max_workers is not None:
+        try:
+            max_workers = int(max_workers)
+        except (TypeError, ValueError):
+            return jsonify({"error": "maxWorkers must be an integer"}), 400
+
+    def process_one(prompt):
+        result = call_mcp("process_request", {"prompt": prompt})
+        publish_video("created", result.get("video_url"))
+        return result
+
+    def events():
+        for event in run_batch(prompts, process_one, max_workers=max_workers):
+            if event["type"] == "summary":
+                logger.info("Batch finished: %s", event)
+            yield json.dumps(event) + "\n"
+
+    return Response(stream_with_context(events()), mimetype="application/x-ndjson")
+
 @app.route('/capabilities', methods=['GET'])
 def get_capabilities():
     """Get MCP server capabilities and tool information"""
@@ -198,37 +392,95 @@ def get_capabilities():
         logger.error("Failed to get capabilities: %s", e)
         return jsonify({"error": str(e)}), 500
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Get MCP server metrics (request coalescing, waiters, ...)"""
+    try:
+        result = call_mcp("get_metrics", {})
+        return jsonify(result)
+    except Exception as e:
+        logger.error("Failed to get metrics: %s", e)
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/videos', methods=['GET', 'DELETE'])
 def list_or_delete_all():
     if request.method == 'GET':
-        items = []
-        for mp4 in VIDEO_DIR.glob("*.mp4"):
-            stat = mp4.stat()
-            items.append({
-                "id":         mp4.stem,
-                "name":       mp4.stem,
-                "url":        f"/videos/{mp4.name}",
-                "created_at": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                "duration":   None
-            })
-        return jsonify(items)
-
-    # Delete all videos
+        return jsonify([video_item(mp4) for mp4 in VIDEO_DIR.glob("*.mp4")])
+
+    # Delete all videos, except those an edit is working on right now
+    busy = []
     for mp4 in VIDEO_DIR.glob("*.mp4"):
         try:
-            mp4.unlink()
+            with video_lock(mp4.stem):
+                mp4.unlink()
+                remove_hls(mp4.stem)
+            frame_server.forget(mp4)
+            publish_deleted(mp4.stem)
+        except VideoBusyError:
+            busy.append(mp4.stem)
         except Exception as e:
             logger.error(f"Error deleting {mp4}: {e}")
+    if busy:
+        return jsonify({"error": "Some videos are being edited and were not deleted", "busy": busy}), 409
     return "", 204
 
+@app.route('/videos/events', methods=['GET'])
+def video_events():
+    """
+    Server-sent change feed for the video library.
+
+    Clients pass their last cursor (``?cursor=`` or the Last-Event-ID header
+    EventSource sends on reconnect) and receive only newer ``change`` events.
+    A missing or stale cursor first gets one ``sync`` event with the full list.
+    """
+    cursor = request.args.get("cursor") or request.headers.get("Last-Event-ID")
+
+    def sse(event, data, event_id=None):
+        head = f"id: {event_id}\n" if event_id else ""
+        return f"{head}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    def full_sync():
+        # Take the cursor before listing: changes racing the listing are
+        # replayed afterwards and applied idempotently by the client.
+        sync_cursor = video_feed.cursor()
+        videos = [video_item(mp4) for mp4 in VIDEO_DIR.glob("*.mp4")]
+        return sync_cursor, sse("sync", {"cursor": sync_cursor, "videos": videos}, sync_cursor)
+
+    def stream(cursor):
+        yield "retry: 3000\n\n"
+        if video_feed.since(cursor) is None:
+            cursor, event = full_sync()
+            yield event
+        while True:
+            events = video_feed.wait(cursor, FEED_HEARTBEAT_SECONDS)
+            if events is None:
+                cursor, event = full_sync()
+                yield event
+            elif not events:
+                yield ": keep-alive\n\n"
+            for change in events or []:
+                cursor = change["cursor"]
+                yield sse("change", change, cursor)
+
+    response = Response(stream_with_context(stream(cursor)), mimetype="text/event-stream")
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/videos/<path:filename>', methods=['GET','DELETE'])
 def serve_or_delete_video(filename):
     full = VIDEO_DIR / filename
     if request.method == 'DELETE':
         if full.exists():
             try:
-                full.unlink()
+                with video_lock(full.stem):
+                    full.unlink()
+                    remove_hls(full.stem)
+                frame_server.forget(full)
+                publish_deleted(full.stem)
                 return "", 204
+            except VideoBusyError as e:
+                return jsonify({"error": str(e)}), 409
             except Exception as e:
                 logger.error(f"Error deleting {filename}: {e}")
                 return jsonify({"error": "Failed to delete video"}), 500
@@ -253,6 +505,64 @@ def serve_or_delete_video(filename):
     
     return response
 
+@app.route('/videos/<video_id>/frame', methods=['GET'])
+def get_frame(video_id):
+    """
+    Frame shown at time ``t`` (seconds), as JPEG, optionally scaled to width
+    ``w``. Several times (``t=1,2.5,4`` or repeated ``t``) return JSON
+    ``{"frames": [{"t", "time", "image"}]}`` with data-URI images instead.
+    """
+    full = VIDEO_DIR / f"{video_id}.mp4"
+    if not full.is_file():
+        return jsonify({"error": "Video not found"}), 404
+    try:
+        times = [float(t) for value in request.args.getlist("t") for t in value.split(",") if t.strip()]
+        width = request.args.get("w", type=int)
+    except ValueError:
+        return jsonify({"error": "t must be a number of seconds"}), 400
+    if not times or not all(math.isfinite(t) and t >= 0 for t in times):
+        return jsonify({"error": "t must be one or more non-negative times"}), 400
+    if len(times) > FRAME_MAX_BATCH:
+        return jsonify({"error": f"Too many timestamps: {len(times)} (max {FRAME_MAX_BATCH})"}), 400
+    if width is not None and width <= 0:
+        return jsonify({"error": "w must be a positive integer"}), 400
+
+    try:
+        frames = frame_server.frames(full, times, width)
+    except Exception as e:
+        logger.error("Frame extraction failed for %s: %s", video_id, e)
+        return jsonify({"error": "Failed to extract frame"}), 500
+
+    if len(times) > 1:
+        return jsonify({"frames": [
+            {"t": f["t"], "time": f["time"],
+             "image": "data:image/jpeg;base64," + base64.b64encode(f["jpeg"]).decode("ascii")}
+            for f in frames
+        ]})
+
+    frame = frames[0]
+    response = Response(frame["jpeg"], mimetype="image/jpeg")
+    response.headers['X-Frame-Time'] = f"{frame['time']:.6f}"
+    # The file can be trimmed in place, so revalidate instead of caching blindly
+    response.set_etag(f"{full.stat().st_mtime_ns}-{frame['time']:.6f}-{width or 0}")
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.route('/videos/<video_id>/hls/<path:name>', methods=['GET'])
+def serve_hls(video_id, name):
+    """Serve HLS playlists and segments produced by the packaging stage"""
+    base = Path(serving_dir(video_id))
+    if not (base / name).is_file():
+        return "", 404
+    response = send_from_directory(base, name, as_attachment=False)
+    if name.endswith(".m3u8"):
+        # Event playlists grow while packaging is still running
+        response.mimetype = "application/vnd.apple.mpegurl"
+        response.headers['Cache-Control'] = 'no-cache'
+    else:
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
 @app.route('/videos/<video_id>/trim', methods=['POST'])
 def trim_video(video_id):
     try:
@@ -266,35 +576,21 @@ def trim_video(video_id):
         if not input_path.exists():
             return jsonify({"error": "Video not found"}), 404
         
-        # Create a temporary file for the trimmed video
-        temp_id = str(uuid.uuid4())
-        temp_path = VIDEO_DIR / f"temp_{temp_id}.mp4"
+        # The encode reads the source fully before atomically replacing it,
+        # so the trimmed file can target the original path directly.
+        with video_lock(video_id):
+            trim_video_file(input_path, input_path, start, end)
+            remove_hls(video_id)
         
-        try:
-            # Trim the video to the temporary file
-            trim_video_file(input_path, temp_path, start, end)
-            
-            # Replace the original file with the trimmed version
-            if temp_path.exists():
-                # Remove the original file
-                input_path.unlink()
-                # Move the trimmed file to replace the original
-                shutil.move(str(temp_path), str(input_path))
-            
-            return jsonify({
-                "video_url": f"/videos/{video_id}.mp4",
-                "message": "Video trimmed successfully"
-            })
-            
-        except Exception as e:
-            # Clean up temp file if it exists
-            if temp_path.exists():
-                try:
-                    temp_path.unlink()
-                except:
-                    pass
-            raise e
+        publish_video("updated", f"/videos/{video_id}.mp4")
+        return jsonify({
+            "video_url": f"/videos/{video_id}.mp4",
+            "hls_url": schedule_packaging(str(input_path)),
+            "message": "Video trimmed successfully"
+        })
             
+    except VideoBusyError as e:
+        return jsonify({"error": str(e)}), 409
     except ValueError as e:
         logger.error("Trim validation error: %s", e)
         return jsonify({"error": str(e)}), 400
@@ -322,9 +618,11 @@ def merge_videos():
         output_path = VIDEO_DIR / f"{output_id}.mp4"
         
         merge_video_files(input_paths, output_path)
+        publish_video("created", f"/videos/{output_id}.mp4")
         
         return jsonify({
             "video_url": f"/videos/{output_id}.mp4",
+            "hls_url": schedule_packaging(str(output_path)),
             "merged_id": output_id,
             "message": "Videos merged successfully"
         })
@@ -333,7 +631,82 @@ def merge_videos():
         logger.error("Merge failed: %s", e)
         return jsonify({"error": f"Failed to merge videos: {str(e)}"}), 500
 
+@app.route('/edits', methods=['POST'])
+def create_edit():
+    """
+    Create a non-destructive edit from ordered clips:
+    {"clips": [{"source": "<video or edit id>", "in": 0, "out": 4.5}, ...]}
+    Nothing is encoded here; chained edits collapse onto the original sources.
+    """
+    try:
+        body = request.get_json(force=True)
+        clips = flatten(body.get("clips"), edl_store.load, probe_duration, source_version)
+        edl = edl_store.save(clips)
+        return jsonify(edl_store.describe(edl)), 201
+    except StaleEDLError as e:
+        return jsonify({"error": str(e)}), 409
+    except EDLError as e:
+        logger.error("Edit validation error: %s", e)
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error("Edit creation failed: %s", e)
+        return jsonify({"error": f"Failed to create edit: {str(e)}"}), 500
+
+@app.route('/edits/<edit_id>', methods=['GET'])
+def get_edit(edit_id):
+    edl = edl_store.load(edit_id) if is_edl_id(edit_id) else None
+    if edl is None:
+        return jsonify({"error": "Edit not found"}), 404
+    return jsonify({**edl_store.describe(edl), "stale": bool(stale_sources(edl, source_version))})
+
+@app.route('/edits/<edit_id>/video', methods=['GET'])
+def play_edit(edit_id):
+    """Serve an edit, materializing it on first playback"""
+    edl = edl_store.load(edit_id) if is_edl_id(edit_id) else None
+    if edl is None:
+        return jsonify({"error": "Edit not found"}), 404
+    try:
+        path = materialize_edl(edl)
+    except StaleEDLError as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        logger.error("Materializing %s failed: %s", edit_id, e)
+        return jsonify({"error": f"Failed to render edit: {str(e)}"}), 500
+    # Content-addressed (including source versions), so the file for a given id never changes
+    response = send_from_directory(os.path.dirname(path), os.path.basename(path), as_attachment=False)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@app.route('/edits/<edit_id>/export', methods=['POST'])
+def export_edit(edit_id):
+    """Materialize an edit and add it to the video library as a new video"""
+    edl = edl_store.load(edit_id) if is_edl_id(edit_id) else None
+    if edl is None:
+        return jsonify({"error": "Edit not found"}), 404
+    try:
+        path = materialize_edl(edl)
+        output_id = str(uuid.uuid4())
+        output_path = VIDEO_DIR / f"{output_id}.mp4"
+        tmp_path = VIDEO_DIR / f".{output_id}.mp4.part"   # not listed as a video
+        shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, output_path)
+        publish_video("created", f"/videos/{output_id}.mp4")
+        return jsonify({
+            "video_url": f"/videos/{output_id}.mp4",
+            "hls_url": schedule_packaging(str(output_path)),
+            "video_id": output_id,
+            "message": "Edit exported successfully"
+        })
+    except StaleEDLError as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        logger.error("Export failed: %s", e)
+        return jsonify({"error": f"Failed to export edit: {str(e)}"}), 500
+
 # ─── Startup ──────────────────────────────────────────────────────────────────
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True, use_reloader=False)
\ No newline at end of file
+    # PyAV and the edit worker processes are only needed for editing; load
+    # them in the background instead of before the first request.
+    start_warmup("flask", encode.warm_up, editing.warm_pool)
+    app.run(host="0.0.0.0", port=int(os.getenv("PORT", "5000")), debug=True, use_reloader=False)
\ No newline at end of file
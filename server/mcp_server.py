@@ -3,22 +3,28 @@
 import json
 import logging
 import os
-import requests
+import importlib
+import itertools
+import threading
 from typing import Dict, List, Any
-from mcp.server.fastmcp import FastMCP
-from dotenv import load_dotenv
-from tools.manim_tool import ManimTool
-from tools.render_tool import RenderTool
+from utils.config import load_config, configure_logging, start_warmup
 
-load_dotenv()
+# Load .env once, before importing modules that read settings at import time
+load_config()
 
-logging.basicConfig(level=logging.DEBUG)
+import anyio
+from mcp.server.fastmcp import FastMCP, Context
+from utils.batch import run_batch, MAX_BATCH_SIZE
+from utils import metrics
+
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Tool registry with metadata
 TOOL_REGISTRY = {
     "generate_manim_code": {
-        "instance": ManimTool(),
+        "instance": None,  # created on first use, see get_tool()
+        "factory": "tools.manim_tool:ManimTool",
         "description": "Generates Python code using Manim library for creating mathematical animations, geometric shapes, text animations, and educational visualizations. Use this when user wants to create animations, mathematical content, or visual demonstrations.",
         "input_schema": {
             "type": "object",
@@ -33,7 +39,8 @@ TOOL_REGISTRY = {
         "keywords": ["animation", "manim", "mathematical", "geometric", "visual", "educational", "shapes", "text", "movement", "graphics"]
     },
     "render_video": {
-        "instance": RenderTool(),
+        "instance": None,  # created on first use, see get_tool()
+        "factory": "tools.render_tool:RenderTool",
         "description": "Renders Manim Python code into an MP4 video file. Use this after generating manim code or when user has existing manim code that needs to be converted to video.",
         "input_schema": {
             "type": "object",
@@ -85,11 +92,34 @@ TOOL_REGISTRY = {
     }
 }
 
+_tool_lock = threading.Lock()
+
+def get_tool(tool_name: str):
+    """Return the tool instance, importing its module on first use"""
+    entry = TOOL_REGISTRY[tool_name]
+    if entry["instance"] is None and entry.get("factory"):
+        with _tool_lock:
+            if entry["instance"] is None:
+                module_name, class_name = entry["factory"].split(":")
+                entry["instance"] = getattr(importlib.import_module(module_name), class_name)()
+    return entry["instance"]
+
 class LLMToolSelector:
     def __init__(self):
         self.github_token = os.getenv("GITHUB_TOKEN")
         if not self.github_token:
             logger.error("No GITHUB_TOKEN found for LLM tool selection!")
+        self._llm = None
+    
+    @property
+    def llm(self):
+        """Hedged, retried and circuit-broken client; created on first LLM call"""
+        if self._llm is None:
+            with _tool_lock:
+                if self._llm is None:
+                    from utils.llm_client import LLMClient
+                    self._llm = LLMClient("selector", timeout=30)
+        return self._llm
     
     def select_tools(self, user_prompt: str) -> List[Dict[str, Any]]:
         """Use LLM to analyze prompt and select appropriate tools"""
@@ -161,7 +191,6 @@ For "show me my videos":
     
     def _call_llm(self, messages: List[Dict]) -> str:
         """Call GitHub Models API for tool selection"""
-        url = "https://models.github.ai/inference/chat/completions"
         headers = {
             "Authorization": f"Bearer {self.github_token}",
             "Accept": "application/vnd.github+json",
@@ -175,9 +204,7 @@ For "show me my videos":
             "max_tokens": 800,
         }
         
-        resp = requests.post(url, headers=headers, json=payload, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
+        data = self.llm.chat(headers, payload)
         return data["choices"][0]["message"]["content"]
     
     def _fallback_selection(self, user_prompt: str) -> List[Dict[str, Any]]:
@@ -237,18 +264,42 @@ For "show me my videos":
 mcp = FastMCP(
     name="VidCraftAI",
     host="0.0.0.0", 
-    port=8000,
+    port=int(os.getenv("MCP_PORT", "8000")),
     stateless_http=True,
 )
 
 tool_selector = LLMToolSelector()
 
 @mcp.tool("process_request")
-def process_user_request(prompt: str) -> dict:
+async def _process_request(prompt: str, ctx: Context) -> dict:
+    """
+    Intelligently processes user requests by selecting and executing appropriate tools.
+    This is the main entry point that uses LLM reasoning to choose the right tools.
+    """
+    # Callers that send a progressToken get step and partial-code events as
+    # progress notifications (the message is a JSON-encoded event).
+    on_event = None
+    meta = ctx.request_context.meta
+    if meta is not None and meta.progressToken is not None:
+        sequence = itertools.count(1)
+
+        def on_event(event: dict) -> None:
+            try:
+                anyio.from_thread.run(ctx.report_progress, next(sequence), None, json.dumps(event))
+            except Exception as e:
+                logger.debug("Dropping progress event: %s", e)
+
+    # Run on a worker thread so concurrent requests (e.g. batch fan-out from
+    # Flask) don't serialize behind one blocking call on the event loop.
+    return await anyio.to_thread.run_sync(process_user_request, prompt, on_event)
+
+def process_user_request(prompt: str, on_event=None) -> dict:
     """
     Intelligently processes user requests by selecting and executing appropriate tools.
     This is the main entry point that uses LLM reasoning to choose the right tools.
+    ``on_event``, if given, is called with step and partial-code events.
     """
+    emit = on_event or (lambda _event: None)
     try:
         # Step 1: Use LLM to select tools
         tool_plan = tool_selector.select_tools(prompt)
@@ -269,6 +320,7 @@ def process_user_request(prompt: str) -> dict:
             
             logger.info(f"Step {step_idx + 1}: Executing {tool_name} - {reasoning}")
             execution_log.append(f"Step {step_idx + 1}: {reasoning}")
+            emit({"type": "step", "step": step_idx + 1, "tool": tool_name, "reasoning": reasoning})
             
             if tool_name not in TOOL_REGISTRY:
                 error_msg = f"Unknown tool: {tool_name}"
@@ -307,12 +359,12 @@ def process_user_request(prompt: str) -> dict:
                 return {"error": "Render tool requires code parameter but none was provided"}
             
             # Execute the tool
-            tool_instance = TOOL_REGISTRY[tool_name]["instance"]
+            tool_instance = get_tool(tool_name)
             try:
                 if tool_name == "generate_manim_code":
                     if "prompt" not in processed_parameters:
                         return {"error": "generate_manim_code requires a prompt parameter"}
-                    result = tool_instance.run(processed_parameters["prompt"])
+                    result = tool_instance.run(processed_parameters["prompt"], on_partial=on_event)
                 elif tool_name == "render_video":
                     if "code" not in processed_parameters:
                         return {"error": "render_video requires a code parameter"}
@@ -353,16 +405,41 @@ def process_user_request(prompt: str) -> dict:
         logger.error(f"Request processing failed: {e}", exc_info=True)
         return {"error": f"Request processing failed: {str(e)}"}
 
+def process_batch_request(prompts: List[str], max_workers: int = None) -> dict:
+    """Run process_user_request over many prompts with dedup and fan-out"""
+    if not prompts:
+        return {"error": "prompts is empty"}
+    if len(prompts) > MAX_BATCH_SIZE:
+        return {"error": f"Batch too large: {len(prompts)} prompts (max {MAX_BATCH_SIZE})"}
+
+    items = []
+    summary = {}
+    for event in run_batch(prompts, process_user_request, max_workers=max_workers):
+        if event["type"] == "item":
+            items.append(event)
+        else:
+            summary = event
+    items.sort(key=lambda item: item["index"])
+    return {"items": items, "summary": summary, "status": "success"}
+
+@mcp.tool("process_batch")
+async def _process_batch(prompts: List[str], max_workers: int = None) -> dict:
+    """
+    Processes many prompts at once. Identical and near-identical prompts are
+    executed once and share a result; unique prompts run concurrently.
+    """
+    return await anyio.to_thread.run_sync(process_batch_request, prompts, max_workers)
+
 # Keep the original tools for backward compatibility (optional)
 @mcp.tool("generate_manim_code")
 def _gen_code(prompt: str) -> dict:
     """Direct access to code generation tool (legacy)"""
-    return TOOL_REGISTRY["generate_manim_code"]["instance"].run(prompt)
+    return get_tool("generate_manim_code").run(prompt)
 
 @mcp.tool("render_video")  
 def _render_video(code: str) -> dict:
     """Direct access to video rendering tool (legacy)"""
-    return TOOL_REGISTRY["render_video"]["instance"].run(code)
+    return get_tool("render_video").run(code)
 
 @mcp.tool("open_burger_menu")
 def _open_burger_menu(reason: str) -> dict:
@@ -388,6 +465,11 @@ def _open_video_editor(reason: str, suggested_videos: List[str] = None) -> dict:
         "status": "ui_action_requested"
     }
 
+@mcp.tool("get_metrics")
+def get_metrics() -> dict:
+    """Returns process counters and gauges (e.g. coalesced requests and waiters)"""
+    return metrics.snapshot()
+
 @mcp.tool("list_capabilities")
 def list_capabilities() -> dict:
     """Lists all available tools and their capabilities"""
@@ -402,12 +484,19 @@ def list_capabilities() -> dict:
     return {
         "capabilities": capabilities,
         "primary_tool": "process_request",
+        "batch_tool": "process_batch",
         "description": "VidCraftAI can intelligently create and render mathematical animations using Manim, and provide UI control for video management",
         "workflow": "1. Analyze prompt → 2. Select tools → 3. Execute in sequence → 4. Return results with UI actions",
         "ui_features": ["Video Library Management", "Video Editor", "Intelligent Tool Selection"]
     }
 
+def _warm_tools():
+    for tool_name in ("generate_manim_code", "render_video"):
+        get_tool(tool_name)
+    tool_selector.llm
+
 if __name__ == "__main__":
+    start_warmup("mcp", _warm_tools)
     mcp.run(
         transport="streamable-http",
         mount_path="/mcp",
@@ -3,29 +3,27 @@
 import os
 import re
 import json
+import hashlib
 import logging
-import requests
-from dotenv import load_dotenv, find_dotenv
-
-# ——— configure logging —————————————————————
-logging.basicConfig(level=logging.DEBUG)
+import threading
+from collections import OrderedDict
+from utils.batch import normalize_prompt
+from utils.singleflight import SingleFlight
+from utils.llm_client import LLMClient, LLMUnavailableError
+from utils.scenes import SceneStreamValidator, InvalidCodeStream
+from utils import metrics
+
+# Logging and .env loading are configured once by the entry point (utils.config)
 logger = logging.getLogger(__name__)
 
-# ——— load the nearest .env (walks upward), overriding any existing env vars —————————————————————
-load_dotenv(find_dotenv(), override=True)
-
-# ——— grab your token and verify it —————————————————————
-GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
-if not GITHUB_TOKEN:
-    logger.error("No GITHUB_TOKEN found in environment!")
-else:
-    logger.debug("→ GITHUB_TOKEN loaded (%d chars)", len(GITHUB_TOKEN))
-
 # ——— system prompt + few-shot —————————————————————
 SYSTEM = (
     "You are a code generator for Manim Community v0.19.0. "
     "Return ONLY a valid Python script defining one class `MyScene(Scene)` "
-    "with a `construct()` method—no markdown fences or commentary."
+    "with a `construct()` method—no markdown fences or commentary. "
+    "For a longer explainer with distinct parts, instead define several scene classes "
+    "`MyScene1(Scene)`, `MyScene2(Scene)`, ... in playback order, each with its own "
+    "`construct()` and not depending on the others' objects. "
     "And make sure the texts don't overlap and spelling is correct"
     "Avoid using heavy libraries like miktex mathtex"
     "Ensure the video is in 16:9 frame and as per user's prompt"
@@ -53,20 +51,65 @@ class MyScene(Scene):
     }
 ]
 
+# concurrent identical prompts share one LLM call
+_inflight = SingleFlight("manim")
+
+_llm = LLMClient("manim", timeout=60)
+
+# Stream completions and validate them as they arrive; a clearly invalid
+# completion is cut off and retried instead of waiting for all its tokens
+MANIM_STREAM = os.getenv("MANIM_STREAM", "1") != "0"
+MANIM_STREAM_ATTEMPTS = int(os.getenv("MANIM_STREAM_ATTEMPTS", "2"))
+
+# Last good code per prompt, served only when the upstream is degraded
+CODE_CACHE_SIZE = int(os.getenv("MANIM_CODE_CACHE_SIZE", "256"))
+_code_cache = OrderedDict()
+_code_cache_lock = threading.Lock()
+
+def _remember(key: str, code: str) -> None:
+    with _code_cache_lock:
+        _code_cache[key] = code
+        _code_cache.move_to_end(key)
+        while len(_code_cache) > CODE_CACHE_SIZE:
+            _code_cache.popitem(last=False)
+
+def _recall(key: str):
+    with _code_cache_lock:
+        return _code_cache.get(key)
+
 class ManimTool:
-    def run(self, prompt: str, **_kwargs) -> dict:
+    def __init__(self):
+        # ——— grab your token and verify it —————————————————————
+        self.github_token = os.getenv("GITHUB_TOKEN")
+        if not self.github_token:
+            logger.error("No GITHUB_TOKEN found in environment!")
+        else:
+            logger.debug("→ GITHUB_TOKEN loaded (%d chars)", len(self.github_token))
+
+    def run(self, prompt: str, on_partial=None, **_kwargs) -> dict:
+        """
+        Generate scene code for ``prompt``. ``on_partial`` (streaming mode
+        only) receives ``{"type": "attempt"}`` and ``{"type": "code"}`` events
+        as validated lines arrive; callers joining an in-flight generation
+        just get the final result.
+        """
         # early exit if no token
-        if not GITHUB_TOKEN:
+        if not self.github_token:
             return {"error": "Missing GITHUB_TOKEN in environment"}
 
+        key = hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()
+        result, shared = _inflight.do(key, self._generate, prompt, key, on_partial)
+        if shared:
+            logger.debug("→ Reused in-flight generation for identical prompt")
+        return dict(result)
+
+    def _generate(self, prompt: str, key: str, on_partial=None) -> dict:
         # build the chat messages
         messages = [{"role": "system", "content": SYSTEM}] + FEW_SHOT
         messages.append({"role": "user", "content": prompt})
 
-        # inference endpoint
-        url = "https://models.github.ai/inference/chat/completions"
         headers = {
-            "Authorization":        f"Bearer {GITHUB_TOKEN}",
+            "Authorization":        f"Bearer {self.github_token}",
             "Accept":               "application/vnd.github+json",
             "X-GitHub-Api-Version": "2022-11-28",
             "Content-Type":         "application/json",
@@ -79,28 +122,28 @@ class ManimTool:
         }
 
         logger.debug("→ GitHub Models API request:")
-        logger.debug("    URL:           %s", url)
-        logger.debug("    Payload max_tokens=%d", payload["max_tokens"])
+        logger.debug("    URL:           %s", _llm.url)
+        logger.debug("    Payload max_tokens=%d stream=%s", payload["max_tokens"], MANIM_STREAM)
 
         try:
-            resp = requests.post(url, headers=headers, json=payload, timeout=60)
-            logger.debug("← status=%s body[:200]=%s", resp.status_code, resp.text[:200].replace("\n"," "))
-            resp.raise_for_status()
-            data = resp.json()
+            if MANIM_STREAM:
+                code = self._stream_code(headers, payload, on_partial)
+            else:
+                code = self._complete_code(headers, payload)
+        except LLMUnavailableError as e:
+            cached = _recall(key)
+            if cached:
+                logger.warning("→ Upstream degraded (%s); serving cached code", e)
+                return {"code": cached, "cached": True}
+            return {"error": f"GitHub Models API error: {e}"}
+        except InvalidCodeStream as e:
+            logger.error("Generated code rejected: %s", e)
+            return {
+                "error": "Generated code was invalid after post‑processing. Try again with a shorter prompt."
+            }
         except Exception as e:
             return {"error": f"GitHub Models API error: {e}"}
 
-        choices = data.get("choices")
-        if not choices:
-            return {"error": f"No choices in response: {json.dumps(data)}"}
-
-        # extract the raw code
-        code = choices[0]["message"]["content"]
-
-        # strip any markdown fences
-        code = re.sub(r"^```(?:python)?\n", "", code)
-        code = re.sub(r"\n```$", "", code)
-
         # **replace bad rate_function names** with the correct ones
         code = re.sub(r"\brate_functions\.ease_in\b",   "rate_functions.ease_in_quad",  code)
         code = re.sub(r"\brate_functions\.ease_out\b",  "rate_functions.ease_out_quad", code)
@@ -114,4 +157,52 @@ class ManimTool:
                 "error": "Generated code was invalid after post‑processing. Try again with a shorter prompt."
             }
 
+        _remember(key, code)
         return {"code": code}
+
+    def _complete_code(self, headers: dict, payload: dict) -> str:
+        data = _llm.chat(headers, payload)
+        choices = data.get("choices")
+        if not choices:
+            raise RuntimeError(f"No choices in response: {json.dumps(data)}")
+
+        # extract the raw code
+        code = choices[0]["message"]["content"]
+
+        # strip any markdown fences
+        code = re.sub(r"^```(?:python)?\n", "", code)
+        code = re.sub(r"\n```$", "", code)
+        return code
+
+    def _stream_code(self, headers: dict, payload: dict, on_partial=None) -> str:
+        """
+        Stream the completion through SceneStreamValidator. An attempt that
+        turns out invalid is closed right away (the upstream stops spending
+        tokens on it) and the next attempt starts at a higher temperature.
+        """
+        emit = on_partial or (lambda _event: None)
+        error = None
+        for attempt in range(1, MANIM_STREAM_ATTEMPTS + 1):
+            check = SceneStreamValidator()
+            emit({"type": "attempt", "attempt": attempt})
+            stream = _llm.stream(headers, payload)
+            try:
+                for delta in stream:
+                    lines = check.feed(delta)
+                    if lines:
+                        emit({"type": "code", "attempt": attempt, "text": lines})
+                    if check.done:
+                        break
+                rest = check.flush()
+                if rest:
+                    emit({"type": "code", "attempt": attempt, "text": rest})
+                return check.finish()
+            except InvalidCodeStream as e:
+                metrics.incr("manim.stream_aborts")
+                logger.warning("→ Attempt %d rejected after %d chars: %s", attempt, check.received, e)
+                emit({"type": "rejected", "attempt": attempt, "reason": str(e)})
+                error = e
+            finally:
+                stream.close()
+            payload = {**payload, "temperature": min(1.0, payload["temperature"] + 0.3)}
+        raise error
@@ -1,67 +1,220 @@
 # server/tools/render_tool.py
 
 import os
-import uuid
+import time
+import shutil
+import hashlib
 import subprocess
 import tempfile
 import logging
+import threading
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from utils.storage import save_video_path
+from utils.singleflight import SingleFlight
+from utils.hls import schedule_packaging
+from utils.limits import Limits, ResourceLimitExceeded, run_limited
+from utils.scenes import SCENE_NAME, skipped_scenes, split_scenes
+from utils.encode import can_concat_copy, concat_copy, encode_timeline
+from utils import metrics
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Manim renders are CPU bound; cap how many run at once so batch fan-out and
+# concurrent requests queue here instead of oversubscribing the cores.
+RENDER_CONCURRENCY = int(os.getenv("RENDER_CONCURRENCY", str(os.cpu_count() or 1)))
+_render_slots = threading.BoundedSemaphore(RENDER_CONCURRENCY)
+
+# Per-render limits: RENDER_TIMEOUT, RENDER_CPU_SECONDS, RENDER_MEMORY_MB,
+# RENDER_MAX_FILE_MB (0 disables) and optionally a delegated RENDER_CGROUP
+RENDER_LIMITS = Limits.from_env("RENDER")
+
+MANIM_QUALITY = "-ql"
+
+# Rendered scenes, keyed by a hash of the source each one depends on, so
+# re-rendering edited multi-scene code only redoes the scenes that changed
+SCENE_CACHE_DIR = os.getenv("SCENE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "vidcraft-scenes"))
+SCENE_CACHE_MAX_BYTES = int(os.getenv("SCENE_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+os.makedirs(SCENE_CACHE_DIR, exist_ok=True)
+
+# concurrent renders of byte-identical code (or of an identical scene) share one manim run
+_inflight = SingleFlight("render")
+_scene_inflight = SingleFlight("scene")
+
 class RenderTool:
     def run(self, code: str, **_kwargs) -> dict:
-        # 1) Write your scene to a temp file
-        tmpdir     = Path(tempfile.gettempdir())
-        scene_id   = uuid.uuid4().hex
-        scene_file = tmpdir / f"scene_{scene_id}.py"
-        logger.debug("→ Writing generated code to %s", scene_file)
-        scene_file.write_text(code, encoding="utf-8")
-
-        # 2) Run Manim from inside that temp dir
+        key = hashlib.sha256(code.encode("utf-8")).hexdigest()
+        try:
+            result, shared = _inflight.do(key, self._render, code)
+        except ResourceLimitExceeded as e:
+            return {"error": str(e), "error_type": "resource_limit", "limit": e.limit}
+        if shared:
+            logger.debug("→ Reused in-flight render for identical code")
+        return dict(result)
+
+    def _render(self, code: str) -> dict:
+        # 1) Split the code into its ordered scenes
+        try:
+            scenes = split_scenes(code)
+            skipped = skipped_scenes(code)
+        except SyntaxError:
+            scenes, skipped = [], []
+        if skipped:
+            logger.warning("→ Not rendering %s: only %s* scenes are rendered", ", ".join(skipped), SCENE_NAME)
+        if not scenes:
+            scenes = [(SCENE_NAME, code)]   # let manim report what's wrong
+
+        # Scratch lives in the cache dir so clips can be hard-linked into it
+        scratch = tempfile.mkdtemp(prefix="render_", dir=SCENE_CACHE_DIR)
+        try:
+            # 2) Render every scene at once; each is its own manim process, and
+            #    _render_slots caps how many run across all requests
+            started = time.perf_counter()
+            dests = [os.path.join(scratch, f"scene_{i:03d}.mp4") for i in range(len(scenes))]
+            if len(scenes) == 1:
+                clips = [self._scene(*scenes[0], dests[0])]
+            else:
+                pool = ThreadPoolExecutor(max_workers=len(scenes), thread_name_prefix="scene")
+                try:
+                    futures = [pool.submit(self._scene, name, source, dest)
+                               for (name, source), dest in zip(scenes, dests)]
+                    clips = [f.result() for f in futures]
+                finally:
+                    # on failure the other scenes still finish and land in the cache
+                    pool.shutdown(wait=False)
+            logger.info("→ Rendered %d scene(s) in %.1fs", len(scenes), time.perf_counter() - started)
+
+            # 3) Stitch the scenes together and move the result into server/videos/
+            out = os.path.join(scratch, "video.mp4")
+            if len(clips) == 1:
+                shutil.copyfile(clips[0], out)
+            elif can_concat_copy(clips):
+                concat_copy(clips, out, scratch_dir=scratch)
+            else:
+                # mismatched stream layouts (e.g. only some scenes have audio)
+                encode_timeline([(clip, 0, None) for clip in clips], out, scratch_dir=scratch)
+            final = save_video_path(out)
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+        logger.debug("→ Saved to videos/: %s", final)
+
+        result = {"video_url": f"/videos/{Path(final).name}"}
+        if len(scenes) > 1:
+            result["scenes"] = [name for name, _ in scenes]
+        if skipped:
+            result["skipped_scenes"] = skipped
+        hls = schedule_packaging(final)
+        if hls:
+            result["hls_url"] = hls
+        return result
+
+    def _scene(self, name: str, source: str, dest: str) -> str:
+        """
+        The rendered MP4 for one scene, from the cache when possible, pinned
+        at ``dest``: a hard link there keeps the clip readable even if
+        another render's cache pruning evicts the entry before we stitch.
+        """
+        key = hashlib.sha256(f"{MANIM_QUALITY}\0{name}\0{source}".encode("utf-8")).hexdigest()
+        path = os.path.join(SCENE_CACHE_DIR, f"{key}.mp4")
+        for _ in range(3):
+            if os.path.exists(path):
+                metrics.incr("render.scene_cache_hits")
+                logger.debug("→ Reusing cached render of %s", name)
+            else:
+                _scene_inflight.do(key, self._render_scene, name, source, path)
+            try:
+                _pin(path, dest)
+            except FileNotFoundError:
+                if not os.path.isdir(os.path.dirname(dest)):
+                    raise   # the render gave up and removed its scratch dir
+                # evicted between the render (or cache check) and the link
+                logger.debug("→ Cached render of %s was evicted, rendering again", name)
+                continue
+            os.utime(dest)  # same inode as the cache entry: marks it recently used
+            return dest
+        raise RuntimeError(f"Scene cache too small to keep {name} (SCENE_CACHE_MAX_BYTES)")
+
+    def _render_scene(self, name: str, source: str, path: str) -> str:
+        if os.path.exists(path):
+            return path
+        metrics.incr("render.scenes")
+
+        # 1) Write the scene to its own work dir (manim's media goes there too)
+        workdir    = Path(tempfile.mkdtemp(prefix="scene_", dir=SCENE_CACHE_DIR))
+        scene_file = workdir / "scene.py"
+        logger.debug("→ Writing %s to %s", name, scene_file)
+        scene_file.write_text(source, encoding="utf-8")
+
+        # 2) Run Manim from inside that dir
         cmd = [
             "manim",
             scene_file.name,
-            "MyScene",
-            "-ql",
+            name,
+            MANIM_QUALITY,
             "--format", "mp4",
+            "--media_dir", "media",
         ]
         logger.info("→ Running Manim: %s", " ".join(cmd))
         try:
-            subprocess.run(
-                cmd,
-                cwd=tmpdir,
-                check=True,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.PIPE,
-            )
+            with _render_slots:
+                run_limited(cmd, RENDER_LIMITS, name=f"render-{workdir.name}", cwd=workdir)
+
+            # 3) Locate the MP4 and move it into the cache
+            candidates = [p for p in (workdir / "media").rglob(f"{name}.mp4")
+                          if "partial_movie_files" not in p.parts]
+            if not candidates:
+                raise FileNotFoundError(f"No MP4 found for {name} under {workdir}")
+            os.replace(max(candidates, key=lambda p: p.stat().st_mtime), path)
+        except ResourceLimitExceeded as e:
+            metrics.incr("render.limit_hits")
+            metrics.incr(f"render.limit_hits.{e.limit}")
+            logger.error("Manim render of %s stopped by %s limit", name, e.limit)
+            raise
         except subprocess.CalledProcessError as e:
             err = e.stderr.decode(errors="ignore")
             logger.error("Manim render failed:\n%s", err)
             raise RuntimeError(f"Manim render failed:\n{err}")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        _prune_scene_cache(keep=path)
+        return path
 
-        # 3) Locate the newly created MP4
-        scene_stem = scene_file.stem
-        candidates = list(tmpdir.rglob(f"{scene_stem}*.mp4"))
-        if not candidates:
-            candidates = [p for p in tmpdir.rglob("*.mp4") if scene_stem in str(p)]
-        if not candidates:
-            raise FileNotFoundError(f"No MP4 found for {scene_stem} under {tmpdir}")
 
-        # 4) Pick the newest
-        latest = max(candidates, key=lambda p: p.stat().st_mtime)
-        logger.debug("→ Selected MP4: %s", latest)
+def _pin(path: str, dest: str) -> None:
+    """Hard-link ``path`` to ``dest`` (copy where links aren't supported)."""
+    try:
+        os.link(path, dest)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        shutil.copyfile(path, dest)
 
-        # 5) Move it into server/videos/
-        final = save_video_path(str(latest))
-        logger.debug("→ Copied to videos/: %s", final)
 
-        # 6) Cleanup only the scene file
+def _prune_scene_cache(max_bytes: int = SCENE_CACHE_MAX_BYTES, keep: str = None) -> None:
+    """
+    Evict least recently used scene renders beyond ``max_bytes``. Entries
+    pinned by a render in progress (linked into its scratch dir) and
+    ``keep`` (a render not pinned yet) are skipped.
+    """
+    entries = []
+    for entry in os.scandir(SCENE_CACHE_DIR):
+        if not entry.name.endswith(".mp4") or not entry.is_file():
+            continue
         try:
-            scene_file.unlink()
+            st = entry.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, entry.path, st.st_nlink))
+    total = sum(size for _, size, _, _ in entries)
+    for _, size, path, links in sorted(entries):
+        if total <= max_bytes:
+            break
+        if links > 1 or path == keep:
+            continue
+        try:
+            os.unlink(path)
+            total -= size
+            logger.debug("Evicted cached scene %s", path)
         except OSError:
             pass
-
-        return {"video_url": f"/videos/{Path(final).name}"}
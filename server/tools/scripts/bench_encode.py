@@ -0,0 +1,70 @@
+# server/tools/scripts/bench_encode.py
+"""
+Wall-clock scaling of the chunked encode engine with worker count.
+
+    python tools/scripts/bench_encode.py --duration 120 --workers 1 2 4 8
+
+Generates a synthetic test video (or uses --input), then encodes the same
+timeline (two back-to-back copies, like a merge) with each worker count and
+prints elapsed time and speed-up relative to a single worker.
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from utils.encode import encode_timeline, ffmpeg_binary, probe  # noqa: E402
+
+
+def make_source(path: str, duration: int) -> None:
+    subprocess.run(
+        [ffmpeg_binary(), "-v", "error", "-y",
+         "-f", "lavfi", "-i", f"testsrc2=size=854x480:rate=15:duration={duration}",
+         "-f", "lavfi", "-i", f"sine=frequency=440:duration={duration}",
+         "-c:v", "libx264", "-g", "30", "-c:a", "aac", "-shortest", path],
+        check=True,
+    )
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", help="existing MP4 to encode (default: synthetic test video)")
+    parser.add_argument("--duration", type=int, default=60, help="synthetic video length in seconds")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, cores} & set(range(1, cores + 1))))
+    parser.add_argument("--chunk-seconds", type=float, default=None)
+    parser.add_argument("--preset", default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_encode_") as tmp:
+        src = args.input
+        if not src:
+            src = os.path.join(tmp, "source.mp4")
+            make_source(src, args.duration)
+        info = probe(src)
+        segments = [(src, 0, None), (src, 0, None)]
+        print(f"source: {info['width']}x{info['height']} @ {info['fps']} fps, "
+              f"{info['duration']:.1f}s x2, {len(info['keyframes'])} keyframes, {cores} cores")
+        print(f"{'workers':>8} {'threads':>8} {'seconds':>9} {'speed-up':>9}")
+
+        baseline = None
+        for workers in args.workers:
+            out = os.path.join(tmp, f"out_{workers}.mp4")
+            threads = max(1, cores // workers)
+            started = time.perf_counter()
+            encode_timeline(segments, out, workers=workers, threads=threads,
+                            chunk_seconds=args.chunk_seconds, preset=args.preset)
+            elapsed = time.perf_counter() - started
+            baseline = baseline or elapsed
+            print(f"{workers:>8} {threads:>8} {elapsed:>9.2f} {baseline / elapsed:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
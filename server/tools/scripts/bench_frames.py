@@ -0,0 +1,92 @@
+# server/tools/scripts/bench_frames.py
+"""
+Latency of frame extraction through utils.frames.FrameServer.
+
+    python tools/scripts/bench_frames.py --duration 120 --requests 200
+
+Generates a synthetic test video (or uses --input) and times, per frame:
+a naive extraction that opens the file and decodes from the start, random
+single-frame requests on a cold server, the same requests again (cache
+hits), and a scrubbing pattern (small forward steps) with the cache off.
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from utils.encode import ffmpeg_binary, probe  # noqa: E402
+from utils.frames import FrameServer  # noqa: E402
+
+
+def make_source(path: str, duration: int) -> None:
+    subprocess.run(
+        [ffmpeg_binary(), "-v", "error", "-y",
+         "-f", "lavfi", "-i", f"testsrc2=size=854x480:rate=15:duration={duration}",
+         "-c:v", "libx264", "-g", "30", path],
+        check=True,
+    )
+
+
+def naive_frame(path: str, t: float):
+    import av
+
+    with av.open(path) as container:
+        shown = None
+        for frame in container.decode(video=0):
+            if shown is not None and frame.time > t:
+                break
+            shown = frame
+        return shown
+
+
+def timed(label: str, fn, times) -> None:
+    started = time.perf_counter()
+    for t in times:
+        fn(t)
+    per = (time.perf_counter() - started) / len(times) * 1000
+    print(f"{label:>22}: {per:8.2f} ms/frame")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", help="existing MP4 (default: synthetic test video)")
+    parser.add_argument("--duration", type=int, default=60, help="synthetic video length in seconds")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--width", type=int, default=320)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_frames_") as tmp:
+        src = args.input
+        if not src:
+            src = os.path.join(tmp, "source.mp4")
+            make_source(src, args.duration)
+        info = probe(src)
+        print(f"source: {info['width']}x{info['height']} @ {info['fps']} fps, "
+              f"{info['duration']:.1f}s, {len(info['keyframes'])} keyframes")
+
+        random.seed(0)
+        times = [random.uniform(0, info["duration"]) for _ in range(args.requests)]
+        timed("naive (decode from 0)", lambda t: naive_frame(src, t), times[:max(1, len(times) // 10)])
+
+        server = FrameServer()
+        timed("random, cold", lambda t: server.frames(src, [t], args.width), times)
+        timed("random, cached", lambda t: server.frames(src, [t], args.width), times)
+
+        uncached = FrameServer(cache_bytes=0)
+        scrub = [5 + i * 0.1 for i in range(args.requests)]
+        timed("scrub forward", lambda t: uncached.frames(src, [t], args.width), scrub)
+
+        started = time.perf_counter()
+        FrameServer().frames(src, times[:64], args.width)
+        print(f"{'batch of 64, cold':>22}: {(time.perf_counter() - started) * 1000:8.2f} ms total")
+
+
+if __name__ == "__main__":
+    main()
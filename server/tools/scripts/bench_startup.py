@@ -0,0 +1,94 @@
+# server/tools/scripts/bench_startup.py
+"""
+Cold-start benchmark: time from process launch to the first successfully
+served request, for the Flask API (GET /) and the MCP server (tools/list).
+
+    python tools/scripts/bench_startup.py --runs 5
+
+Each run starts a fresh interpreter on a free port, polls until the server
+answers, records the elapsed time and stops it. Set WARMUP=0 in the
+environment to measure without the background warm-up thread.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+import urllib.request
+from pathlib import Path
+
+SERVER_DIR = Path(__file__).resolve().parents[2]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def probe_flask(port: int) -> bool:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as resp:
+        return resp.status == 200
+
+
+def probe_mcp(port: int) -> bool:
+    body = json.dumps({"jsonrpc": "2.0", "id": "1", "method": "tools/list", "params": {}}).encode()
+    req = urllib.request.Request(
+        f"http://127.0.0.1:{port}/mcp", data=body, method="POST",
+        headers={"Content-Type": "application/json", "Accept": "application/json, text/event-stream"},
+    )
+    with urllib.request.urlopen(req, timeout=1) as resp:
+        return resp.status == 200
+
+
+ENTRY_POINTS = {
+    "flask": ("app.py", "PORT", probe_flask),
+    "mcp": ("mcp_server.py", "MCP_PORT", probe_mcp),
+}
+
+
+def time_to_first_request(script: str, port_var: str, probe, timeout: float) -> float:
+    port = free_port()
+    env = {**os.environ, port_var: str(port), "LOG_LEVEL": "WARNING"}
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, script], cwd=SERVER_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"{script} exited with code {proc.returncode}")
+            try:
+                if probe(port):
+                    return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError(f"{script} did not answer within {timeout}s")
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--only", choices=sorted(ENTRY_POINTS))
+    args = parser.parse_args()
+
+    for name, (script, port_var, probe) in ENTRY_POINTS.items():
+        if args.only and name != args.only:
+            continue
+        samples = [time_to_first_request(script, port_var, probe, args.timeout) for _ in range(args.runs)]
+        print(f"{name:>6}: median {statistics.median(samples) * 1000:7.1f} ms  "
+              f"min {min(samples) * 1000:7.1f} ms  max {max(samples) * 1000:7.1f} ms  ({args.runs} runs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# server/tools/scripts/llm_stub.py
+"""
+Local chat-completions stub with injectable latency and errors, for
+exercising utils.llm_client (hedging, retries, circuit breaking).
+
+Serve it and point the servers at it:
+
+    python tools/scripts/llm_stub.py --port 8765 --latency 0.3 --tail-rate 0.1 --tail 5 --error-rate 0.2
+    LLM_API_URL=http://localhost:8765/chat/completions python mcp_server.py
+
+Or drive N calls through LLMClient against it and print latency and metrics:
+
+    python tools/scripts/llm_stub.py --drive 100 --tail-rate 0.1 --tail 3 --error-rate 0.1
+
+Requests with ``"stream": true`` get an SSE token stream (--token-delay per
+chunk); --bad-rate of them start with prose, to exercise early aborts.
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+SCENE = """from manim import *
+
+class MyScene(Scene):
+    def construct(self):
+        self.play(Create(Circle()))
+        self.wait()
+"""
+
+BAD_SCENE = "Sure! Here is a Manim scene that draws a circle:\n\n```python\n" + SCENE + "```\n"
+
+
+def make_handler(args):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            delay = args.tail if random.random() < args.tail_rate else args.latency
+            time.sleep(delay)
+            if random.random() < args.error_rate:
+                self.send_response(args.error_status)
+                self.end_headers()
+                self.wfile.write(b'{"error": "injected"}')
+                return
+            if request.get("stream"):
+                self.stream(BAD_SCENE if random.random() < args.bad_rate else SCENE)
+                return
+            body = json.dumps({"choices": [{"message": {"role": "assistant", "content": SCENE}}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def stream(self, text):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            try:
+                for i in range(0, len(text), 4):
+                    chunk = {"choices": [{"delta": {"content": text[i:i + 4]}}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                    time.sleep(args.token_delay)
+                self.wfile.write(b"data: [DONE]\n\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass    # client aborted the stream
+
+        def log_message(self, *_args):
+            pass
+
+    return Handler
+
+
+def drive(args, url):
+    from utils import metrics
+    from utils.llm_client import LLMClient, LLMUnavailableError
+
+    client = LLMClient("stub", timeout=args.timeout, url=url)
+    latencies, failures = [], 0
+
+    def one(_):
+        started = time.perf_counter()
+        try:
+            client.chat({}, {"messages": []})
+            return time.perf_counter() - started
+        except LLMUnavailableError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for result in pool.map(one, range(args.drive)):
+            if result is None:
+                failures += 1
+            else:
+                latencies.append(result)
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else float("nan")
+    print(f"calls={args.drive} ok={len(latencies)} failed={failures} "
+          f"p50={pct(0.5):.3f}s p95={pct(0.95):.3f}s p99={pct(0.99):.3f}s breaker={client.breaker.state}")
+    print(json.dumps(metrics.snapshot()["counters"], indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="normal response delay (s)")
+    parser.add_argument("--tail", type=float, default=3.0, help="slow response delay (s)")
+    parser.add_argument("--tail-rate", type=float, default=0.05, help="fraction of slow responses")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of error responses")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--token-delay", type=float, default=0.02, help="delay between streamed chunks (s)")
+    parser.add_argument("--bad-rate", type=float, default=0.0, help="fraction of streams that start with prose")
+    parser.add_argument("--drive", type=int, default=0, help="issue N calls through LLMClient, then exit")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args))
+    url = f"http://127.0.0.1:{server.server_port}/chat/completions"
+    if not args.drive:
+        print(f"LLM stub listening on {url}")
+        server.serve_forever()
+        return
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        drive(args, url)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# server/utils/batch.py
+
+import os
+import re
+import time
+import logging
+import difflib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
+
+# Opt-in fuzzy dedup: prompts with the same words, numbers and symbols whose
+# normalized text is at least this similar are treated as one job. The
+# default (1.0) only merges prompts that are identical after normalization.
+NEAR_DUPLICATE_RATIO = float(os.getenv("BATCH_NEAR_DUPLICATE_RATIO", "1.0"))
+
+# Punctuation that doesn't change what a prompt asks for; anything else
+# (digits, ^ * + - = ...) is content and must match for a fuzzy merge
+_SENTENCE_PUNCTUATION = set(",.;:!?'\"")
+
+# Codegen is I/O bound (LLM round-trips), so the batch pool can be wider than the
+# core count; renders are capped separately inside RenderTool.
+DEFAULT_BATCH_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", str(min(32, (os.cpu_count() or 1) * 4))))
+
+MAX_BATCH_SIZE = int(os.getenv("BATCH_MAX_SIZE", "200"))
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lower-case, collapse whitespace and drop trailing punctuation."""
+    text = re.sub(r"\s+", " ", prompt.strip().lower())
+    return text.rstrip(" .!?;,")
+
+
+def _content_tokens(norm: str) -> tuple:
+    tokens = re.findall(r"\w+|[^\w\s]", norm)
+    return tuple(sorted(t for t in tokens if t not in _SENTENCE_PUNCTUATION))
+
+
+def dedupe_prompts(prompts, near_ratio: float = NEAR_DUPLICATE_RATIO) -> list:
+    """
+    Map every prompt index to the index of the canonical prompt that will
+    actually be executed. Identical prompts (after normalization) collapse
+    directly. With ``near_ratio`` below 1.0, prompts that contain exactly
+    the same words, numbers and symbols also collapse when their similarity
+    ratio is at least ``near_ratio`` (e.g. differing only in punctuation);
+    prompts whose content differs are never merged.
+    """
+    canonical = []          # list of (index, normalized text, content tokens)
+    by_text = {}
+    mapping = []
+    for idx, prompt in enumerate(prompts):
+        norm = normalize_prompt(prompt)
+        if norm in by_text:
+            mapping.append(by_text[norm])
+            continue
+
+        match = None
+        tokens = _content_tokens(norm)
+        if near_ratio < 1.0:
+            for canon_idx, canon_norm, canon_tokens in canonical:
+                if tokens != canon_tokens:
+                    continue
+                matcher = difflib.SequenceMatcher(None, norm, canon_norm)
+                if matcher.real_quick_ratio() < near_ratio or matcher.quick_ratio() < near_ratio:
+                    continue
+                if matcher.ratio() >= near_ratio:
+                    match = canon_idx
+                    break
+
+        if match is None:
+            match = idx
+            canonical.append((idx, norm, tokens))
+        by_text[norm] = match
+        mapping.append(match)
+    return mapping
+
+
+def run_batch(prompts, worker, max_workers: int = None, near_ratio: float = NEAR_DUPLICATE_RATIO):
+    """
+    Execute ``worker(prompt) -> dict`` once per unique prompt on a thread pool
+    and yield per-item events as they complete, followed by a summary event.
+
+    Item events: {"type": "item", "index", "prompt", "duplicate_of", "elapsed", "result"}
+    Summary:     {"type": "summary", "total", "unique", "succeeded", "failed",
+                  "elapsed", "throughput_per_min"}
+    """
+    prompts = list(prompts)
+    mapping = dedupe_prompts(prompts, near_ratio)
+    unique = sorted(set(mapping))
+    followers = {}
+    for idx, canon in enumerate(mapping):
+        followers.setdefault(canon, []).append(idx)
+
+    workers = max(1, min(max_workers or DEFAULT_BATCH_WORKERS, len(unique) or 1))
+    logger.info("Batch: %d prompts, %d unique, %d workers", len(prompts), len(unique), workers)
+
+    def _timed(prompt):
+        began = time.perf_counter()
+        try:
+            result = worker(prompt)
+        except Exception as e:
+            logger.error("Batch item failed: %s", e, exc_info=True)
+            result = {"error": str(e)}
+        if not isinstance(result, dict):
+            result = {"error": f"Unexpected worker result: {result!r}"}
+        return result, time.perf_counter() - began
+
+    started = time.perf_counter()
+    succeeded = failed = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as pool:
+        futures = {pool.submit(_timed, prompts[idx]): idx for idx in unique}
+        for fut in as_completed(futures):
+            canon = futures[fut]
+            result, elapsed = fut.result()
+            for idx in followers[canon]:
+                if "error" in result:
+                    failed += 1
+                else:
+                    succeeded += 1
+                yield {
+                    "type": "item",
+                    "index": idx,
+                    "prompt": prompts[idx],
+                    "duplicate_of": None if idx == canon else canon,
+                    "elapsed": round(elapsed, 3),
+                    "result": result,
+                }
+
+    total_elapsed = time.perf_counter() - started
+    yield {
+        "type": "summary",
+        "total": len(prompts),
+        "unique": len(unique),
+        "succeeded": succeeded,
+        "failed": failed,
+        "elapsed": round(total_elapsed, 3),
+        "throughput_per_min": round(len(prompts) / total_elapsed * 60, 2) if total_elapsed > 0 else None,
+    }
@@ -0,0 +1,54 @@
+# server/utils/config.py
+
+import os
+import time
+import logging
+import threading
+
+_loaded = False
+_lock = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def load_config() -> None:
+    """
+    Load the nearest .env (walks upward), overriding any existing env vars.
+    Runs once per process; entry points call it before importing modules
+    that read their settings at import time.
+    """
+    global _loaded
+    with _lock:
+        if _loaded:
+            return
+        from dotenv import load_dotenv, find_dotenv
+        load_dotenv(find_dotenv(), override=True)
+        _loaded = True
+
+
+def configure_logging() -> None:
+    level = os.getenv("LOG_LEVEL", "DEBUG").upper()
+    logging.basicConfig(level=getattr(logging, level, logging.DEBUG))
+
+
+def start_warmup(name: str, *steps):
+    """
+    Run ``steps`` (callables) on a daemon thread so heavy imports and pools
+    are ready before the first request needs them, without delaying startup.
+    Disabled with WARMUP=0.
+    """
+    if os.getenv("WARMUP", "1").lower() in ("0", "false", "no"):
+        return None
+
+    def _run():
+        started = time.perf_counter()
+        for step in steps:
+            try:
+                step()
+            except Exception as e:
+                logger.warning("%s warm-up step %s failed: %s", name, getattr(step, "__name__", step), e)
+        logger.info("%s warm-up finished in %.2fs", name, time.perf_counter() - started)
+
+    thread = threading.Thread(target=_run, name=f"{name}-warmup", daemon=True)
+    thread.start()
+    return thread
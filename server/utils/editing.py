@@ -0,0 +1,135 @@
+# server/utils/editing.py
+
+import os
+import shutil
+import logging
+import tempfile
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from utils import metrics
+from utils.encode import encode_timeline, ENCODE_WORKERS
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: fall back to in-process locks only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Concurrent edit jobs (trim / merge / EDL materialization). Each job fans out
+# into its own chunk encoders, so the per-job encoder count is scaled down.
+EDIT_WORKERS = int(os.getenv("EDIT_WORKERS", str(max(1, (os.cpu_count() or 1) // 2))))
+EDIT_SCRATCH_DIR = os.getenv("EDIT_SCRATCH_DIR", os.path.join(tempfile.gettempdir(), "vidcraft-edits"))
+LOCK_DIR = os.path.join(EDIT_SCRATCH_DIR, "locks")
+os.makedirs(LOCK_DIR, exist_ok=True)
+
+_pool = None
+_pool_lock = threading.Lock()
+_local_locks = {}
+
+
+class VideoBusyError(RuntimeError):
+    """Raised when another edit currently holds the lock for a video id."""
+
+
+def _encode_job(segments, output_path, workers):
+    """Runs in a worker process: encode inside a private scratch directory."""
+    scratch = tempfile.mkdtemp(prefix="job_", dir=EDIT_SCRATCH_DIR)
+    try:
+        return encode_timeline(segments, output_path, workers=workers, scratch_dir=scratch)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the Flask server is multi-threaded
+            _pool = ProcessPoolExecutor(max_workers=EDIT_WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _discard_pool(broken) -> None:
+    """Drop a pool whose worker died so the next job starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is broken:  # another thread may already have replaced it
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _noop():
+    return None
+
+
+def warm_pool() -> None:
+    """Start the worker processes now so the first edit doesn't pay for spawning them."""
+    pool = _get_pool()
+    for future in [pool.submit(_noop) for _ in range(EDIT_WORKERS)]:
+        future.result()
+
+
+def run_encode(segments, output_path) -> str:
+    """
+    Encode ``(src, start, end)`` segments to ``output_path`` on the edit
+    worker pool and wait for the result. The output appears atomically.
+    If a worker process dies (crash, OOM kill) the pool is replaced and the
+    job retried once.
+    """
+    workers = max(1, ENCODE_WORKERS // EDIT_WORKERS)
+    segments = [(str(src), start, end) for src, start, end in segments]
+    metrics.gauge_add("edit.running", 1)
+    try:
+        for attempt in range(2):
+            pool = _get_pool()
+            try:
+                result = pool.submit(_encode_job, segments, str(output_path), workers).result()
+                break
+            except BrokenProcessPool:
+                _discard_pool(pool)
+                metrics.incr("edit.pool_restarts")
+                if attempt:
+                    raise
+                logger.warning("Edit worker died, restarting the pool and retrying %s", output_path)
+        metrics.incr("edit.jobs")
+        return result
+    except Exception:
+        metrics.incr("edit.failed")
+        raise
+    finally:
+        metrics.gauge_add("edit.running", -1)
+
+
+@contextmanager
+def video_lock(video_id: str):
+    """
+    Exclusive, non-blocking lock on a video id across threads and processes.
+    Raises VideoBusyError if another edit holds it.
+    """
+    if fcntl is None:
+        lock = _local_locks.setdefault(video_id, threading.Lock())
+        if not lock.acquire(blocking=False):
+            raise VideoBusyError(f"Video {video_id} is already being edited")
+        try:
+            yield
+        finally:
+            lock.release()
+        return
+
+    fd = os.open(os.path.join(LOCK_DIR, f"{video_id}.lock"), os.O_CREAT | os.O_RDWR)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise VideoBusyError(f"Video {video_id} is already being edited")
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
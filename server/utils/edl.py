@@ -0,0 +1,221 @@
+# server/utils/edl.py
+
+import os
+import re
+import json
+import hashlib
+import logging
+import tempfile
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# EDL ids are content hashes of their flattened clip list, so identical edits
+# share one id and one materialized file. Each clip records the version
+# (mtime + size) of its source, so editing a source in place yields new ids.
+EDL_PREFIX = "edl_"
+_ID_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+# Materialized MP4s are evicted oldest-first once the cache exceeds this size
+EDL_CACHE_MAX_BYTES = int(os.getenv("EDL_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+
+
+class EDLError(ValueError):
+    """Raised for malformed edit decision lists or unresolvable sources."""
+
+
+class StaleEDLError(EDLError):
+    """A source video was modified after the edit referencing it was created."""
+
+
+def is_edl_id(source_id: str) -> bool:
+    return source_id.startswith(EDL_PREFIX)
+
+
+def validate_id(source_id) -> str:
+    if not isinstance(source_id, str) or not _ID_RE.match(source_id):
+        raise EDLError(f"Invalid source id: {source_id!r}")
+    return source_id
+
+
+def _time(value, field):
+    if value is None:
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise EDLError(f"{field} must be a number")
+    if value < 0:
+        raise EDLError(f"{field} must not be negative")
+    return round(value, 3)
+
+
+def clips_duration(clips) -> float:
+    return round(sum(c["out"] - c["in"] for c in clips), 3)
+
+
+def stale_sources(edl: dict, source_version) -> list:
+    """Source ids whose current version differs from the one the EDL was cut from."""
+    return sorted({c["source"] for c in edl["clips"] if c.get("version") != source_version(c["source"])})
+
+
+def flatten(raw_clips, load_edl, probe_duration, source_version) -> list:
+    """
+    Resolve a list of ``{"source", "in", "out"}`` clips into clips over
+    original videos only. Clips whose source is another EDL are mapped through
+    that EDL's timeline, so a trim of a trim collapses into a single range on
+    the original file. Adjacent ranges of the same source are merged.
+
+    ``load_edl(id)`` returns a stored EDL dict or None; ``probe_duration(id)``
+    returns the duration in seconds of an original video or None if missing;
+    ``source_version(id)`` returns a token that changes whenever the file
+    does. Clips carry that token, and clips taken from an EDL whose source
+    has since changed are rejected with StaleEDLError.
+    """
+    if not isinstance(raw_clips, list) or not raw_clips:
+        raise EDLError("clips must be a non-empty list")
+
+    flat = []
+    for idx, raw in enumerate(raw_clips):
+        if not isinstance(raw, dict):
+            raise EDLError(f"clip {idx} must be an object")
+        source = validate_id(raw.get("source"))
+        start = _time(raw.get("in"), f"clip {idx} in") or 0.0
+        end = _time(raw.get("out"), f"clip {idx} out")
+
+        if is_edl_id(source):
+            parent = load_edl(source)
+            if parent is None:
+                raise EDLError(f"Edit {source} not found")
+            stale = stale_sources(parent, source_version)
+            if stale:
+                raise StaleEDLError(f"Edit {source} is out of date: {', '.join(stale)} changed since it was created")
+            pieces, total = parent["clips"], parent["duration"]
+        else:
+            total = probe_duration(source)
+            if total is None:
+                raise EDLError(f"Video {source} not found")
+            pieces = [{"source": source, "version": source_version(source), "in": 0.0, "out": round(total, 3)}]
+
+        if end is None or end > total:
+            end = round(total, 3)
+        if start >= end:
+            raise EDLError(f"clip {idx}: start time must be less than end time")
+
+        # Map the [start, end) window on the source timeline onto its pieces
+        offset = 0.0
+        for piece in pieces:
+            length = piece["out"] - piece["in"]
+            lo, hi = max(start, offset), min(end, offset + length)
+            if hi > lo:
+                flat.append({
+                    "source": piece["source"],
+                    "version": piece["version"],
+                    "in": round(piece["in"] + (lo - offset), 3),
+                    "out": round(piece["in"] + (hi - offset), 3),
+                })
+            offset += length
+
+    merged = []
+    for clip in flat:
+        prev = merged[-1] if merged else None
+        if prev and prev["source"] == clip["source"] and prev["version"] == clip["version"] and abs(prev["out"] - clip["in"]) < 1e-3:
+            prev["out"] = clip["out"]
+        else:
+            merged.append(dict(clip))
+    return merged
+
+
+def edl_id(clips) -> str:
+    canonical = json.dumps(clips, sort_keys=True, separators=(",", ":"))
+    return EDL_PREFIX + hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+class EDLStore:
+    """
+    Stores EDLs as JSON under ``root/lists`` and their materialized MP4s under
+    ``root/cache``, both keyed by EDL id.
+    """
+
+    def __init__(self, root):
+        self.lists_dir = os.path.join(str(root), "lists")
+        self.cache_dir = os.path.join(str(root), "cache")
+        os.makedirs(self.lists_dir, exist_ok=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _list_path(self, eid):
+        return os.path.join(self.lists_dir, f"{validate_id(eid)}.json")
+
+    def save(self, clips) -> dict:
+        eid = edl_id(clips)
+        path = self._list_path(eid)
+        if os.path.exists(path):
+            return self.load(eid)
+        edl = {
+            "id": eid,
+            "clips": clips,
+            "duration": clips_duration(clips),
+            "created_at": datetime.now().isoformat(),
+        }
+        # unique temp file: identical concurrent saves must not share one
+        fd, tmp = tempfile.mkstemp(prefix=f".{eid}.", suffix=".tmp", dir=self.lists_dir)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(edl, f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return edl
+
+    def load(self, eid):
+        try:
+            with open(self._list_path(eid), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, EDLError):
+            return None
+
+    def cache_path(self, eid) -> str:
+        return os.path.join(self.cache_dir, f"{validate_id(eid)}.mp4")
+
+    def cached(self, eid):
+        """Return the materialized path if present, refreshing its LRU stamp."""
+        path = self.cache_path(eid)
+        if not os.path.exists(path):
+            return None
+        os.utime(path, None)
+        return path
+
+    def prune(self, max_bytes: int = EDL_CACHE_MAX_BYTES) -> None:
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".mp4") or ".tmp" in name:
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+                logger.debug("Evicted materialized edit %s", path)
+            except OSError:
+                pass
+
+    def describe(self, edl: dict) -> dict:
+        """API representation of an EDL."""
+        return {
+            **edl,
+            "video_url": f"/edits/{edl['id']}/video",
+            "materialized": os.path.exists(self.cache_path(edl["id"])),
+            "preview": [
+                {"url": f"/videos/{c['source']}.mp4", "in": c["in"], "out": c["out"]}
+                for c in edl["clips"]
+            ],
+        }
@@ -0,0 +1,278 @@
+# server/utils/encode.py
+
+import os
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+from fractions import Fraction
+from concurrent.futures import ThreadPoolExecutor
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# ——— encoder settings (all overridable from the environment) —————————————————————
+ENCODE_PRESET = os.getenv("ENCODE_PRESET", "veryfast")
+ENCODE_CRF = os.getenv("ENCODE_CRF", "23")
+# Parallel chunk encoders; each one is its own ffmpeg process
+ENCODE_WORKERS = int(os.getenv("ENCODE_WORKERS", str(os.cpu_count() or 1)))
+# libx264 threads per chunk encoder; 0 splits the cores evenly across workers
+ENCODE_THREADS = int(os.getenv("ENCODE_THREADS", "0"))
+# Target chunk length; actual cuts snap to the next source keyframe
+ENCODE_CHUNK_SECONDS = float(os.getenv("ENCODE_CHUNK_SECONDS", "10"))
+
+_probe_cache = {}
+_probe_lock = threading.Lock()
+
+
+def ffmpeg_binary() -> str:
+    """FFMPEG_BINARY, then ffmpeg on PATH, then the binary bundled with imageio-ffmpeg."""
+    configured = os.getenv("FFMPEG_BINARY")
+    if configured:
+        return configured
+    found = shutil.which("ffmpeg")
+    if found:
+        return found
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        raise RuntimeError("ffmpeg not found: install it or set FFMPEG_BINARY")
+
+
+def warm_up() -> None:
+    """Import PyAV ahead of the first probe."""
+    import av  # noqa: F401
+
+
+def probe(src) -> dict:
+    """
+    Duration, geometry, frame rate, audio presence and keyframe times of a
+    video, read by demuxing with PyAV (no decoding). Cached per path + mtime.
+    """
+    src = str(src)
+    mtime = os.stat(src).st_mtime
+    with _probe_lock:
+        cached = _probe_cache.get(src)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    import av
+
+    with av.open(src) as container:
+        video = container.streams.video[0]
+        rate = video.average_rate or video.guessed_rate or Fraction(30)
+        info = {
+            "width": video.codec_context.width,
+            "height": video.codec_context.height,
+            "fps": str(Fraction(rate).limit_denominator(1001)),
+            "codec": video.codec_context.name,
+            "has_audio": bool(container.streams.audio),
+            "duration": None,
+            "keyframes": [],
+        }
+        if container.duration:
+            info["duration"] = container.duration / av.time_base
+        elif video.duration:
+            info["duration"] = float(video.duration * video.time_base)
+        last = 0.0
+        for packet in container.demux(video):
+            if packet.pts is None:
+                continue
+            t = float(packet.pts * video.time_base)
+            last = max(last, t)
+            if packet.is_keyframe:
+                info["keyframes"].append(t)
+        if info["duration"] is None:
+            info["duration"] = last
+
+    with _probe_lock:
+        _probe_cache[src] = (mtime, info)
+    return info
+
+
+def plan_chunks(segments, chunk_seconds: float = ENCODE_CHUNK_SECONDS) -> list:
+    """
+    Split ``(src, start, end)`` segments into chunks of roughly
+    ``chunk_seconds``, cutting only at source keyframes so each chunk starts
+    with a cheap, exact seek.
+    """
+    chunks = []
+    for src, start, end in segments:
+        info = probe(src)
+        start = max(0.0, start or 0.0)
+        end = info["duration"] if end is None else min(end, info["duration"])
+        if start >= end:
+            raise ValueError("Start time must be less than end time")
+        cut = start
+        for key in info["keyframes"]:
+            if key <= cut or key >= end:
+                continue
+            if key - cut >= chunk_seconds:
+                chunks.append((str(src), cut, key))
+                cut = key
+        chunks.append((str(src), cut, end))
+    return chunks
+
+
+def _chunk_command(ff, chunk, frames, out, target, preset, crf, threads) -> list:
+    """
+    Video-only encode of one chunk to exactly ``frames`` frames; audio is
+    encoded separately by _audio_command().
+    """
+    src, start, end = chunk
+    w, h = target["width"], target["height"]
+    vf = (f"scale={w}:{h}:force_original_aspect_ratio=decrease,"
+          f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={target['fps']},format=yuv420p")
+    # read a frame past the end so rounding never leaves the chunk one short
+    read = end - start + 1 / float(Fraction(target["fps"]))
+    return [ff, "-v", "error", "-y", "-ss", f"{start:.3f}", "-t", f"{read:.3f}", "-i", src,
+            "-map", "0:v:0", "-vf", vf, "-frames:v", str(frames),
+            "-c:v", "libx264", "-preset", preset, "-crf", str(crf), "-threads", str(threads),
+            "-an", "-avoid_negative_ts", "make_zero", out]
+
+
+def _chunk_frames(chunks, fps) -> list:
+    """
+    Frames per chunk, rounded from each chunk's position on the whole
+    timeline so rounding errors don't add up across chunks.
+    """
+    rate = float(Fraction(fps))
+    frames, elapsed = [], 0.0
+    for _, start, end in chunks:
+        first = round(elapsed * rate)
+        elapsed += end - start
+        frames.append(max(1, round(elapsed * rate) - first))
+    return frames
+
+
+def _chunk_spans(chunks) -> list:
+    """Merge consecutive chunks of the same source back into ``(src, start, end)`` segments."""
+    spans = []
+    for src, start, end in chunks:
+        if spans and spans[-1][0] == src and spans[-1][2] == start:
+            spans[-1] = (src, spans[-1][1], end)
+        else:
+            spans.append((src, start, end))
+    return spans
+
+
+def _audio_command(ff, segments, out) -> list:
+    """
+    One AAC track for the whole timeline. Each segment is padded or cut to
+    exactly its length (silence for sources without audio) so the track
+    stays in sync with the video however the video is chunked.
+    """
+    cmd, filters = [ff, "-v", "error", "-y"], []
+    for i, (src, start, end) in enumerate(segments):
+        length = f"{end - start:.6f}"
+        if probe(src)["has_audio"]:
+            cmd += ["-ss", f"{start:.6f}", "-t", length, "-i", src]
+        else:
+            cmd += ["-f", "lavfi", "-t", length, "-i", "anullsrc=r=44100:cl=stereo"]
+        filters.append(f"[{i}:a:0]aresample=44100,aformat=sample_fmts=fltp:channel_layouts=stereo,"
+                       f"apad,atrim=duration={length},asetpts=N/SR/TB[a{i}]")
+    inputs = "".join(f"[a{i}]" for i in range(len(segments)))
+    filters.append(f"{inputs}concat=n={len(segments)}:v=0:a=1[a]")
+    return cmd + ["-filter_complex", ";".join(filters), "-map", "[a]",
+                  "-c:a", "aac", "-b:a", "128k", "-vn", out]
+
+
+def can_concat_copy(paths) -> bool:
+    """Whether the files share a stream layout, so concat_copy() can join them."""
+    layouts = {
+        (info["codec"], info["width"], info["height"], info["fps"], info["has_audio"])
+        for info in map(probe, paths)
+    }
+    return len(layouts) == 1
+
+
+def concat_copy(paths, output_path, scratch_dir=None, audio_path=None) -> str:
+    """
+    Join MP4s with the concat demuxer, without re-encoding. With
+    ``audio_path``, the joined video is muxed with that file's audio instead.
+    """
+    ff = ffmpeg_binary()
+    fd, list_file = tempfile.mkstemp(prefix="concat_", suffix=".txt", dir=scratch_dir)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.writelines(f"file '{os.path.abspath(path)}'\n" for path in paths)
+        cmd = [ff, "-v", "error", "-y", "-f", "concat", "-safe", "0", "-i", list_file]
+        if audio_path:
+            cmd += ["-i", str(audio_path), "-map", "0:v:0", "-map", "1:a:0"]
+        subprocess.run(
+            cmd + ["-c", "copy", "-movflags", "+faststart", "-f", "mp4", str(output_path)],
+            check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        )
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Concat failed:\n{e.stderr.decode(errors='ignore')}")
+    finally:
+        os.unlink(list_file)
+    return str(output_path)
+
+
+def encode_timeline(segments, output_path, workers: int = None, preset: str = None,
+                    threads: int = None, chunk_seconds: float = None, scratch_dir=None):
+    """
+    Encode ordered ``(src, start, end)`` segments into one H.264/AAC MP4.
+
+    The video is split at keyframes and chunks are encoded concurrently by
+    separate ffmpeg processes. Audio is encoded once over the whole timeline
+    alongside them, since per-chunk AAC leaves priming gaps and rounding
+    drift at every seam. The chunks are joined with the concat demuxer and
+    muxed with the audio, without re-encoding. Output is written to a temp
+    file in the destination directory and moved into place atomically.
+    """
+    segments = [(str(src), start, end) for src, start, end in segments]
+    if not segments:
+        raise ValueError("No segments to encode")
+
+    ff = ffmpeg_binary()
+    workers = max(1, workers or ENCODE_WORKERS)
+    preset = preset or ENCODE_PRESET
+    if not threads:
+        threads = ENCODE_THREADS or max(1, (os.cpu_count() or 1) // workers)
+    target = probe(segments[0][0])
+    target = {**target, "width": target["width"] // 2 * 2, "height": target["height"] // 2 * 2}
+    chunks = plan_chunks(segments, chunk_seconds or ENCODE_CHUNK_SECONDS)
+    # plan_chunks clamps the ends; the audio must cover exactly the same ranges
+    segments = _chunk_spans(chunks)
+    audio = any(probe(src)["has_audio"] for src, _, _ in segments)
+    logger.info("Encoding %d segments as %d chunks on %d workers (%s, %d threads each)",
+                len(segments), len(chunks), workers, preset, threads)
+
+    scratch = tempfile.mkdtemp(prefix="encode_", dir=scratch_dir)
+    output_path = str(output_path)
+    # not *.mp4, so listings of the destination never pick up a half-written file
+    tmp_out = os.path.join(os.path.dirname(os.path.abspath(output_path)),
+                           f".{os.path.basename(scratch)}.mp4.part")
+    try:
+        outputs = [os.path.join(scratch, f"chunk_{i:05d}.mp4") for i in range(len(chunks))]
+        frames = _chunk_frames(chunks, target["fps"])
+        audio_out = os.path.join(scratch, "audio.m4a") if audio else None
+
+        def _run(i):
+            if i == len(chunks):
+                cmd, what = _audio_command(ff, segments, audio_out), "Audio"
+            else:
+                cmd = _chunk_command(ff, chunks[i], frames[i], outputs[i], target, preset, ENCODE_CRF, threads)
+                what = f"Chunk {i}"
+            try:
+                subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            except subprocess.CalledProcessError as e:
+                raise RuntimeError(f"{what} encode failed:\n{e.stderr.decode(errors='ignore')}")
+
+        jobs = len(chunks) + (1 if audio else 0)
+        with ThreadPoolExecutor(max_workers=min(workers, jobs), thread_name_prefix="encode") as pool:
+            list(pool.map(_run, range(jobs)))
+
+        concat_copy(outputs, tmp_out, scratch_dir=scratch, audio_path=audio_out)
+        os.replace(tmp_out, output_path)
+        metrics.incr("encode.jobs")
+        metrics.incr("encode.chunks", len(chunks))
+        return output_path
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+        if os.path.exists(tmp_out):
+            os.unlink(tmp_out)
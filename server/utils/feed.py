@@ -0,0 +1,66 @@
+# server/utils/feed.py
+
+import os
+import uuid
+import threading
+from collections import deque
+
+# How many recent changes a reconnecting client can catch up from before it
+# has to fall back to a full sync.
+FEED_HISTORY = int(os.getenv("FEED_HISTORY", "1000"))
+
+
+class ChangeFeed:
+    """
+    In-memory log of video library changes with a monotonic cursor.
+
+    Cursors look like ``<epoch>:<version>``; the epoch changes on every
+    server start, so cursors from a previous process are always stale.
+    """
+
+    def __init__(self, history: int = FEED_HISTORY):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._version = 0
+        self._events = deque(maxlen=history)
+        self._cond = threading.Condition()
+
+    def cursor(self, version: int = None) -> str:
+        return f"{self.epoch}:{self._version if version is None else version}"
+
+    def publish(self, kind: str, video: dict) -> str:
+        """Record a created/updated/deleted event and wake waiting streams."""
+        with self._cond:
+            self._version += 1
+            self._events.append({"cursor": self.cursor(), "version": self._version,
+                                 "type": kind, "video": video})
+            self._cond.notify_all()
+            return self.cursor()
+
+    def _parse(self, cursor):
+        if not cursor:
+            return None
+        epoch, _, version = str(cursor).partition(":")
+        if epoch != self.epoch or not version.isdigit():
+            return None
+        return int(version)
+
+    def _since(self, version):
+        if version is None or version > self._version:
+            return None
+        oldest = self._events[0]["version"] if self._events else self._version + 1
+        if version < oldest - 1:
+            return None
+        return [e for e in self._events if e["version"] > version]
+
+    def since(self, cursor):
+        """Events after ``cursor``, or None if it is stale and a full sync is needed."""
+        with self._cond:
+            return self._since(self._parse(cursor))
+
+    def wait(self, cursor, timeout: float):
+        """Block until something newer than ``cursor`` exists (or timeout), then return since()."""
+        version = self._parse(cursor)
+        with self._cond:
+            if version is not None:
+                self._cond.wait_for(lambda: self._version > version, timeout)
+            return self._since(version)
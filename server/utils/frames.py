@@ -0,0 +1,231 @@
+# server/utils/frames.py
+
+import os
+import bisect
+import logging
+import threading
+from fractions import Fraction
+from collections import OrderedDict
+from contextlib import contextmanager
+from utils import metrics
+from utils.encode import probe
+
+logger = logging.getLogger(__name__)
+
+# Open decoders per video (requests beyond that wait for one to be
+# returned), and how many videos keep theirs open when idle
+FRAME_DECODERS_PER_VIDEO = int(os.getenv("FRAME_DECODERS_PER_VIDEO", "2"))
+FRAME_HOT_VIDEOS = int(os.getenv("FRAME_HOT_VIDEOS", "8"))
+# Encoded frames are cached up to this many bytes in total
+FRAME_CACHE_MAX_BYTES = int(os.getenv("FRAME_CACHE_MAX_BYTES", str(64 * 1024 ** 2)))
+FRAME_MAX_WIDTH = int(os.getenv("FRAME_MAX_WIDTH", "1920"))
+FRAME_MAX_BATCH = int(os.getenv("FRAME_MAX_BATCH", "64"))
+# mjpeg qscale: 2 (best) .. 31 (smallest)
+FRAME_JPEG_QSCALE = os.getenv("FRAME_JPEG_QSCALE", "3")
+
+
+class _Decoder:
+    """
+    One open container positioned somewhere in the video. Requests at or
+    after the current position in the same GOP decode forward from where
+    the last one stopped; anything else seeks to the nearest keyframe at or
+    before ``t`` first.
+    """
+
+    def __init__(self, path: str, keyframes: list):
+        import av
+
+        self.container = av.open(path)
+        self.stream = self.container.streams.video[0]
+        self.stream.thread_type = "AUTO"
+        self.keyframes = keyframes
+        self._frames = None
+        self._current = None   # last frame at or before the previous request
+        self._ahead = None     # the frame decoded after it, if any
+
+    @property
+    def position(self):
+        return None if self._current is None else self._current.time
+
+    def _keyframe_before(self, t: float) -> float:
+        i = bisect.bisect_right(self.keyframes, t)
+        return self.keyframes[i - 1] if i else 0.0
+
+    def frame_at(self, t: float):
+        """The frame on screen at ``t`` seconds (the last one starting at or before it)."""
+        key = self._keyframe_before(t)
+        pos = self.position
+        if pos is None or t < pos or key > pos:
+            metrics.incr("frames.seeks")
+            self.container.seek(int(key / self.stream.time_base), stream=self.stream, backward=True)
+            self._frames = self.container.decode(self.stream)
+            self._current = self._ahead = None
+
+        epsilon = 1e-6
+        while True:
+            if self._ahead is None:
+                self._ahead = next(self._frames, None)
+                if self._ahead is None:
+                    break   # past the last frame: keep showing it
+                metrics.incr("frames.decoded")
+            if self._current is not None and self._ahead.time > t + epsilon:
+                break
+            self._current, self._ahead = self._ahead, None
+        return self._current
+
+    def close(self) -> None:
+        self.container.close()
+
+
+def _encode_jpeg(frame, width: int) -> bytes:
+    import av
+
+    height = max(2, round(frame.height * width / frame.width / 2) * 2)
+    encoder = av.CodecContext.create("mjpeg", "w")
+    encoder.width, encoder.height = width, height
+    encoder.pix_fmt = "yuvj420p"
+    encoder.time_base = frame.time_base
+    encoder.options = {"qmin": FRAME_JPEG_QSCALE, "qmax": FRAME_JPEG_QSCALE}
+    packets = encoder.encode(frame.reformat(width=width, height=height, format="yuvj420p"))
+    packets += encoder.encode(None)
+    return b"".join(bytes(p) for p in packets)
+
+
+class FrameServer:
+    """
+    Frames at arbitrary timestamps, as JPEG. Keeps a small pool of open
+    decoders for the most recently used videos (at most
+    ``decoders_per_video`` in use per video; further requests wait) and an
+    LRU cache of encoded
+    frames (keyed by the source frame, so nearby timestamps share entries)
+    with a byte cap. Files are identified by path + mtime, so an in-place
+    edit invalidates both.
+    """
+
+    def __init__(self, decoders_per_video: int = FRAME_DECODERS_PER_VIDEO,
+                 hot_videos: int = FRAME_HOT_VIDEOS, cache_bytes: int = FRAME_CACHE_MAX_BYTES):
+        self.decoders_per_video = decoders_per_video
+        self.hot_videos = hot_videos
+        self.cache_bytes = cache_bytes
+        self._lock = threading.Lock()
+        self._idle = OrderedDict()     # (path, mtime) -> [decoder, ...], LRU order
+        self._slots = {}               # path -> semaphore capping decoders in use
+        self._cache = OrderedDict()    # (path, mtime, frame index, width) -> (time, jpeg)
+        self._cached_bytes = 0
+
+    @contextmanager
+    def _decoder(self, source, info: dict, t: float):
+        """
+        Borrow the idle decoder that can reach ``t`` cheapest, or open a new
+        one; waits while ``decoders_per_video`` are already in use.
+        """
+        with self._lock:
+            slots = self._slots.setdefault(source[0], threading.BoundedSemaphore(max(1, self.decoders_per_video)))
+        if not slots.acquire(blocking=False):
+            metrics.incr("frames.decoder_waits")
+            slots.acquire()
+        try:
+            with self._lock:
+                idle = self._idle.get(source, [])
+                ahead = [d for d in idle if d.position is not None and d.position <= t]
+                decoder = max(ahead, key=lambda d: d.position) if ahead else (idle[-1] if idle else None)
+                if decoder is not None:
+                    idle.remove(decoder)
+            if decoder is None:
+                metrics.incr("frames.decoders_opened")
+                decoder = _Decoder(source[0], info["keyframes"])
+            try:
+                yield decoder
+            except BaseException:
+                decoder.close()
+                raise
+            self._release(source, decoder)
+        finally:
+            slots.release()
+
+    def _release(self, source, decoder) -> None:
+        evicted = []
+        with self._lock:
+            idle = self._idle.setdefault(source, [])
+            self._idle.move_to_end(source)
+            if len(idle) < self.decoders_per_video:
+                idle.append(decoder)
+            else:
+                evicted.append(decoder)
+            while len(self._idle) > self.hot_videos:
+                _, cold = self._idle.popitem(last=False)
+                evicted.extend(cold)
+        for d in evicted:
+            d.close()
+
+    def _cache_get(self, key):
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+        metrics.incr("frames.cache_hits" if hit else "frames.cache_misses")
+        return hit
+
+    def _cache_put(self, key, value) -> None:
+        with self._lock:
+            if key in self._cache:
+                return
+            self._cache[key] = value
+            self._cached_bytes += len(value[1])
+            while self._cached_bytes > self.cache_bytes and self._cache:
+                _, (_, jpeg) = self._cache.popitem(last=False)
+                self._cached_bytes -= len(jpeg)
+            metrics.set_gauge("frames.cache_bytes", self._cached_bytes)
+
+    def frames(self, path, times, width: int = None) -> list:
+        """
+        ``{"t", "time", "jpeg"}`` for each requested time, in request order;
+        ``time`` is the start of the frame actually shown. Times are decoded
+        in ascending order so one decoder walks forward through the batch.
+        """
+        path = str(path)
+        source = (path, os.stat(path).st_mtime)
+        self._drop(path, keep=source)
+        info = probe(path)
+        width = min(width or info["width"], info["width"], FRAME_MAX_WIDTH)
+        width = max(16, width // 2 * 2)
+        fps = float(Fraction(info["fps"]))
+        last_index = max(0, int(info["duration"] * fps) - 1)
+
+        results = {}
+        misses = []
+        for t in sorted(set(times)):
+            key = (*source, min(int(t * fps + 1e-6), last_index), width)
+            hit = self._cache_get(key)
+            if hit:
+                results[t] = hit
+            else:
+                misses.append((t, key))
+
+        if misses:
+            with self._decoder(source, info, misses[0][0]) as decoder:
+                for t, key in misses:
+                    frame = decoder.frame_at(t)
+                    if frame is None:
+                        raise ValueError(f"No frame at {t:.3f}s")
+                    results[t] = (frame.time, _encode_jpeg(frame, width))
+                    self._cache_put(key, results[t])
+
+        return [{"t": t, "time": results[t][0], "jpeg": results[t][1]} for t in times]
+
+    def forget(self, path) -> None:
+        """Close decoders and drop cached frames of a deleted file."""
+        self._drop(str(path))
+        with self._lock:
+            self._slots.pop(str(path), None)
+
+    def _drop(self, path: str, keep=None) -> None:
+        """Discard decoders and frames of ``path`` other than version ``keep``."""
+        with self._lock:
+            stale = [source for source in self._idle if source[0] == path and source != keep]
+            decoders = [d for source in stale for d in self._idle.pop(source)]
+            if stale or keep is None:
+                for key in [key for key in self._cache if key[0] == path and key[:2] != keep]:
+                    self._cached_bytes -= len(self._cache.pop(key)[1])
+        for d in decoders:
+            d.close()
@@ -0,0 +1,203 @@
+# server/utils/hls.py
+
+import os
+import uuid
+import shutil
+import logging
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from utils import metrics
+from utils.encode import ffmpeg_binary, probe
+from utils.storage import VIDEOS_DIR
+
+logger = logging.getLogger(__name__)
+
+# Optional HLS packaging of finished videos, served from /videos/<id>/hls/...
+HLS_ENABLED = os.getenv("HLS_ENABLED", "0").lower() in ("1", "true", "yes")
+HLS_DIR = os.path.join(VIDEOS_DIR, "hls")
+HLS_SEGMENT_SECONDS = int(os.getenv("HLS_SEGMENT_SECONDS", "4"))
+HLS_SEGMENT_TYPE = os.getenv("HLS_SEGMENT_TYPE", "fmp4")   # "fmp4" or "mpegts"
+# Comma separated "<height>:<video bitrate>" rungs, e.g. "720:2800k,480:1200k".
+# Empty means a single rung that stream-copies the source (no re-encode).
+HLS_RUNGS = os.getenv("HLS_RUNGS", "")
+HLS_WORKERS = int(os.getenv("HLS_WORKERS", "2"))
+
+MASTER_PLAYLIST = "master.m3u8"
+
+_executor = None
+_executor_lock = threading.Lock()
+# One packaging job per video id; a newer job (or a trim/delete) supersedes it
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+class _Job:
+    """A packaging run writing into its own directory until it is moved into place."""
+
+    def __init__(self, video_id: str):
+        self.video_id = video_id
+        self.dir = os.path.join(HLS_DIR, f".{video_id}.{uuid.uuid4().hex}")
+        self.cancelled = False
+        self.proc = None
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.kill()
+
+
+def _register(video_id: str) -> _Job:
+    """Make a new job the current one for ``video_id``, cancelling any earlier job."""
+    job = _Job(video_id)
+    with _jobs_lock:
+        previous = _jobs.get(video_id)
+        _jobs[video_id] = job
+    if previous is not None:
+        metrics.incr("hls.superseded")
+        previous.cancel()
+    return job
+
+
+def parse_rungs(spec: str) -> list:
+    rungs = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        height, _, bitrate = item.partition(":")
+        if not height.isdigit() or not bitrate:
+            raise ValueError(f"Invalid HLS rung {item!r}, expected <height>:<bitrate>")
+        rungs.append((int(height), bitrate))
+    return rungs
+
+
+def hls_dir(video_id: str) -> str:
+    return os.path.join(HLS_DIR, video_id)
+
+
+def serving_dir(video_id: str) -> str:
+    """Where to serve HLS files from: the running job's output while packaging, then the final dir."""
+    with _jobs_lock:
+        job = _jobs.get(video_id)
+        return job.dir if job is not None else hls_dir(video_id)
+
+
+def hls_url(video_id: str):
+    """Master playlist URL if the video has been (or is being) packaged."""
+    if os.path.exists(os.path.join(serving_dir(video_id), MASTER_PLAYLIST)):
+        return f"/videos/{video_id}/hls/{MASTER_PLAYLIST}"
+    return None
+
+
+def remove_hls(video_id: str) -> None:
+    """Cancel any packaging job for ``video_id`` and delete its output."""
+    with _jobs_lock:
+        job = _jobs.pop(video_id, None)
+    if job is not None:
+        job.cancel()
+    shutil.rmtree(hls_dir(video_id), ignore_errors=True)
+
+
+def build_command(src: str, out_dir: str, rungs: list, audio: bool) -> list:
+    """ffmpeg argv producing a master playlist plus one media playlist per rung."""
+    cmd = [ffmpeg_binary(), "-y", "-v", "error", "-i", src]
+    stream_map = []
+    if not rungs:
+        cmd += ["-map", "0:v:0"] + (["-map", "0:a:0"] if audio else []) + ["-c", "copy"]
+        stream_map.append("v:0,a:0,name:source" if audio else "v:0,name:source")
+    else:
+        splits = "".join(f"[v{i}]" for i in range(len(rungs)))
+        graph = [f"[0:v]split={len(rungs)}{splits}"]
+        graph += [f"[v{i}]scale=-2:{h}[v{i}o]" for i, (h, _) in enumerate(rungs)]
+        cmd += ["-filter_complex", ";".join(graph)]
+        for i, (height, bitrate) in enumerate(rungs):
+            cmd += ["-map", f"[v{i}o]", f"-c:v:{i}", "libx264", f"-b:v:{i}", bitrate]
+            if audio:
+                cmd += ["-map", "0:a:0", f"-c:a:{i}", "aac", f"-b:a:{i}", "128k"]
+            stream_map.append(f"v:{i},a:{i},name:{height}p" if audio else f"v:{i},name:{height}p")
+        # Aligned keyframes so every rung can switch at segment boundaries
+        cmd += ["-preset", "veryfast",
+                "-force_key_frames", f"expr:gte(t,n_forced*{HLS_SEGMENT_SECONDS})"]
+
+    ext = "m4s" if HLS_SEGMENT_TYPE == "fmp4" else "ts"
+    cmd += [
+        "-f", "hls",
+        "-hls_time", str(HLS_SEGMENT_SECONDS),
+        # "event" playlists are written as segments complete, so players can
+        # start after the first segment while the rest is still packaging.
+        "-hls_playlist_type", "event",
+        "-hls_segment_type", HLS_SEGMENT_TYPE,
+        "-hls_segment_filename", os.path.join(out_dir, "%v", f"seg_%05d.{ext}"),
+        "-master_pl_name", MASTER_PLAYLIST,
+        "-var_stream_map", " ".join(stream_map),
+    ]
+    if HLS_SEGMENT_TYPE == "fmp4":
+        cmd += ["-hls_fmp4_init_filename", "init.mp4"]
+    cmd.append(os.path.join(out_dir, "%v", "index.m3u8"))
+    return cmd
+
+
+def package_hls(src: str, video_id: str, job: _Job = None):
+    """
+    Segment ``src`` into HLS under HLS_DIR/<video_id>; returns the master URL,
+    or None if the job was superseded. Output is written to a per-job
+    directory and renamed into place, so a stale job never touches the
+    output of a newer one.
+    """
+    job = job or _register(video_id)
+    if job.cancelled:
+        return None
+    os.makedirs(job.dir, exist_ok=True)
+    try:
+        cmd = build_command(src, job.dir, parse_rungs(HLS_RUNGS), probe(src)["has_audio"])
+        logger.info("→ Packaging HLS for %s", video_id)
+        with _jobs_lock:
+            if not job.cancelled:
+                job.proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if job.proc is None:
+            return None
+        _, stderr = job.proc.communicate()
+        if job.cancelled:
+            logger.info("→ HLS packaging for %s superseded", video_id)
+            return None
+        if job.proc.returncode:
+            metrics.incr("hls.failed")
+            err = stderr.decode(errors="ignore")
+            logger.error("HLS packaging failed for %s:\n%s", video_id, err)
+            raise RuntimeError(f"HLS packaging failed:\n{err}")
+
+        with _jobs_lock:
+            if job.cancelled or _jobs.get(video_id) is not job:
+                return None
+            shutil.rmtree(hls_dir(video_id), ignore_errors=True)
+            os.rename(job.dir, hls_dir(video_id))
+            del _jobs[video_id]
+    finally:
+        with _jobs_lock:
+            if _jobs.get(video_id) is job:
+                del _jobs[video_id]
+        shutil.rmtree(job.dir, ignore_errors=True)
+    metrics.incr("hls.packaged")
+    return f"/videos/{video_id}/hls/{MASTER_PLAYLIST}"
+
+
+def schedule_packaging(src: str):
+    """
+    Package ``src`` in the background if HLS is enabled. Returns the master
+    playlist URL the video will be served from, or None when disabled.
+    """
+    global _executor
+    if not HLS_ENABLED:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=HLS_WORKERS, thread_name_prefix="hls")
+    video_id = os.path.splitext(os.path.basename(src))[0]
+    job = _register(video_id)
+
+    def _job():
+        try:
+            package_hls(src, video_id, job)
+        except Exception as e:
+            logger.error("Background HLS packaging failed: %s", e)
+
+    _executor.submit(_job)
+    return f"/videos/{video_id}/hls/{MASTER_PLAYLIST}"
@@ -0,0 +1,180 @@
+# server/utils/limits.py
+
+import os
+import signal
+import logging
+import subprocess
+from dataclasses import dataclass
+
+try:
+    import resource
+except ImportError:  # non-POSIX: only the wall-clock timeout applies
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Limits:
+    """Per-process resource limits; 0 disables a limit."""
+    wall_seconds: float = 0
+    cpu_seconds: int = 0
+    memory_mb: int = 0
+    file_size_mb: int = 0
+    cgroup: str = ""   # delegated cgroup v2 directory, used when writable
+
+    @classmethod
+    def from_env(cls, prefix: str) -> "Limits":
+        return cls(
+            wall_seconds=float(os.getenv(f"{prefix}_TIMEOUT", "300")),
+            cpu_seconds=int(os.getenv(f"{prefix}_CPU_SECONDS", "600")),
+            memory_mb=int(os.getenv(f"{prefix}_MEMORY_MB", "4096")),
+            file_size_mb=int(os.getenv(f"{prefix}_MAX_FILE_MB", "1024")),
+            cgroup=os.getenv(f"{prefix}_CGROUP", ""),
+        )
+
+
+class ResourceLimitExceeded(RuntimeError):
+    """A limited process was stopped for exceeding ``limit`` (timeout/cpu/memory/file_size)."""
+
+    def __init__(self, limit: str, message: str):
+        super().__init__(message)
+        self.limit = limit
+
+
+def _rlimits(limits: Limits) -> list:
+    if resource is None:
+        return []
+    out = []
+    if limits.cpu_seconds:
+        # soft limit delivers SIGXCPU; the hard limit backs it with SIGKILL
+        out.append((resource.RLIMIT_CPU, (limits.cpu_seconds, limits.cpu_seconds + 5)))
+    if limits.memory_mb:
+        size = limits.memory_mb * 1024 * 1024
+        out.append((resource.RLIMIT_AS, (size, size)))
+    if limits.file_size_mb:
+        size = limits.file_size_mb * 1024 * 1024
+        out.append((resource.RLIMIT_FSIZE, (size, size)))
+    return out
+
+
+def _make_cgroup(limits: Limits, name: str):
+    """Create a child cgroup with memory/CPU caps, or None if unavailable."""
+    if not limits.cgroup or not os.access(limits.cgroup, os.W_OK):
+        return None
+    path = os.path.join(limits.cgroup, name)
+    try:
+        os.mkdir(path)
+        if limits.memory_mb:
+            with open(os.path.join(path, "memory.max"), "w") as f:
+                f.write(str(limits.memory_mb * 1024 * 1024))
+            with open(os.path.join(path, "memory.swap.max"), "w") as f:
+                f.write("0")
+        with open(os.path.join(path, "cpu.max"), "w") as f:
+            f.write("100000 100000")   # at most one core
+        return path
+    except OSError as e:
+        logger.warning("cgroup setup failed (%s), falling back to rlimits", e)
+        _remove_cgroup(path)
+        return None
+
+
+def _remove_cgroup(path):
+    if not path:
+        return
+    try:
+        with open(os.path.join(path, "cgroup.kill"), "w") as f:
+            f.write("1")
+    except OSError:
+        pass
+    try:
+        os.rmdir(path)
+    except OSError:
+        pass
+
+
+def _oom_killed(cgroup) -> bool:
+    if not cgroup:
+        return False
+    try:
+        with open(os.path.join(cgroup, "memory.events")) as f:
+            return any(line.split()[0] == "oom_kill" and int(line.split()[1]) > 0 for line in f)
+    except (OSError, ValueError, IndexError):
+        return False
+
+
+def _kill_tree(pgid: int) -> None:
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _classify(returncode: int, stderr: str, cgroup) -> str:
+    signum = -returncode if returncode < 0 else None
+    if signum is not None and signum == getattr(signal, "SIGXCPU", None):
+        return "cpu"
+    # Python ignores SIGXFSZ, so an oversized write surfaces as EFBIG
+    if (signum is not None and signum == getattr(signal, "SIGXFSZ", None)) or "File too large" in stderr:
+        return "file_size"
+    if _oom_killed(cgroup) or "MemoryError" in stderr or "Cannot allocate memory" in stderr \
+            or "std::bad_alloc" in stderr:
+        return "memory"
+    return ""
+
+
+def run_limited(cmd, limits: Limits, name: str = "job", **popen_kwargs):
+    """
+    Run ``cmd`` in its own process group under ``limits``.
+
+    Returns a CompletedProcess with captured stderr on success. Raises
+    ResourceLimitExceeded when a limit stops the process and
+    subprocess.CalledProcessError for any other failure. The whole process
+    group is killed before returning, so no grandchildren outlive the call.
+    """
+    rlimits = _rlimits(limits)
+    use_prlimit = hasattr(resource, "prlimit") if resource else False
+
+    def _preexec():
+        for kind, value in rlimits:
+            resource.setrlimit(kind, value)
+
+    cgroup = _make_cgroup(limits, f"{name}-{os.getpid()}-{id(cmd)}")
+    proc = subprocess.Popen(
+        cmd,
+        start_new_session=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        # prlimit() below avoids preexec_fn, which is unsafe in threaded servers
+        preexec_fn=_preexec if rlimits and not use_prlimit else None,
+        **popen_kwargs,
+    )
+    try:
+        if cgroup:
+            with open(os.path.join(cgroup, "cgroup.procs"), "w") as f:
+                f.write(str(proc.pid))
+        if use_prlimit:
+            for kind, value in rlimits:
+                resource.prlimit(proc.pid, kind, value)
+
+        try:
+            _, stderr = proc.communicate(timeout=limits.wall_seconds or None)
+        except subprocess.TimeoutExpired:
+            _kill_tree(proc.pid)
+            proc.communicate()
+            raise ResourceLimitExceeded(
+                "timeout", f"Process exceeded the {limits.wall_seconds:g}s wall-clock limit")
+
+        err = stderr.decode(errors="ignore")
+        if proc.returncode != 0:
+            limit = _classify(proc.returncode, err, cgroup)
+            if limit:
+                raise ResourceLimitExceeded(limit, f"Process exceeded its {limit} limit:\n{err[-2000:]}")
+            raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=stderr)
+        return subprocess.CompletedProcess(cmd, proc.returncode, stderr=stderr)
+    finally:
+        _kill_tree(proc.pid)
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        _remove_cgroup(cgroup)
@@ -0,0 +1,266 @@
+# server/utils/llm_client.py
+
+import os
+import json
+import time
+import random
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import requests
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Point at a local stub (tools/scripts/llm_stub.py) to test latency/error handling
+LLM_API_URL = os.getenv("LLM_API_URL", "https://models.github.ai/inference/chat/completions")
+
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+# Retries (and hedges) may add at most this fraction of extra load...
+LLM_RETRY_BUDGET_RATIO = float(os.getenv("LLM_RETRY_BUDGET_RATIO", "0.2"))
+# ...plus a small floor so a quiet server can still retry
+LLM_RETRY_BUDGET_MIN = float(os.getenv("LLM_RETRY_BUDGET_MIN", "3"))
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+
+class LLMUnavailableError(RuntimeError):
+    """The upstream model endpoint is failing or the circuit is open."""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """Calls are short-circuited until the breaker's cooldown elapses."""
+
+
+class _RetryableError(Exception):
+    pass
+
+
+# Transport failures worth retrying (and counting against the breaker)
+_TRANSIENT = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+
+class RetryBudget:
+    """
+    Token bucket shared by every call of one client: each request deposits
+    ``ratio`` tokens, each retry or hedge spends one. Keeps retries from
+    multiplying load when the upstream is already struggling.
+    """
+
+    def __init__(self, ratio: float = LLM_RETRY_BUDGET_RATIO, minimum: float = LLM_RETRY_BUDGET_MIN,
+                 cap: float = 100.0):
+        self.ratio, self.cap = ratio, cap
+        self._tokens = minimum
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self.cap, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+class CircuitBreaker:
+    """closed → open after N consecutive failures → half-open probe after cooldown."""
+
+    def __init__(self, failures: int = LLM_BREAKER_FAILURES, cooldown: float = LLM_BREAKER_COOLDOWN):
+        self.failures, self.cooldown = failures, cooldown
+        self.state = "closed"
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state, self._consecutive, self._probing = "closed", 0, False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive += 1
+            self._probing = False
+            if self.state == "half_open" or self._consecutive >= self.failures:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float, min_samples: int = LLM_HEDGE_MIN_SAMPLES):
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+class LLMClient:
+    """
+    Chat-completions client with hedged requests, jittered retries under a
+    shared retry budget, and a circuit breaker. ``transport`` defaults to
+    ``requests.post`` and can be swapped out for a stub.
+    """
+
+    def __init__(self, name: str, timeout: float, url: str = None, max_retries: int = LLM_MAX_RETRIES,
+                 hedge_percentile: float = LLM_HEDGE_PERCENTILE, transport=None):
+        self.name = name
+        self.url = url or LLM_API_URL
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.hedge_percentile = hedge_percentile
+        self.transport = transport or requests.post
+        self.budget = RetryBudget()
+        self.breaker = CircuitBreaker()
+        self.latency = LatencyTracker()
+        self._pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix=f"llm-{name}")
+
+    def _metric(self, suffix: str, value: int = 1) -> None:
+        metrics.incr(f"llm.{self.name}.{suffix}", value)
+
+    def _attempt(self, headers: dict, payload: dict) -> dict:
+        started = time.perf_counter()
+        try:
+            resp = self.transport(self.url, headers=headers, json=payload, timeout=self.timeout)
+        except _TRANSIENT as e:
+            raise _RetryableError(f"{type(e).__name__}: {e}")
+        if resp.status_code == 429 or resp.status_code >= 500:
+            raise _RetryableError(f"HTTP {resp.status_code}: {resp.text[:200]}")
+        resp.raise_for_status()   # other 4xx are caller errors: no retry, no breaker trip
+        try:
+            data = resp.json()
+        except ValueError as e:
+            # a 200 with a garbled or truncated body is an upstream fault
+            raise _RetryableError(f"Undecodable response body: {e}")
+        self.latency.add(time.perf_counter() - started)
+        return data
+
+    def _hedged(self, headers: dict, payload: dict) -> dict:
+        """Send once; if no answer by the latency percentile, send a duplicate and take the first."""
+        delay = self.latency.percentile(self.hedge_percentile)
+        first = self._pool.submit(self._attempt, headers, payload)
+        pending = {first}
+        if delay is not None:
+            done, _ = wait(pending, timeout=delay)
+            if not done and self.budget.withdraw():
+                self._metric("hedges")
+                logger.debug("LLM %s: hedging after %.2fs", self.name, delay)
+                pending.add(self._pool.submit(self._attempt, headers, payload))
+
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                try:
+                    result = fut.result()
+                except _RetryableError as e:
+                    error = e
+                    continue
+                if fut is not first:
+                    self._metric("hedge_wins")
+                return result
+        raise error
+
+    def _with_retries(self, fn, *args):
+        """Run ``fn`` behind the breaker, retrying retryable failures within the budget."""
+        if not self.breaker.allow():
+            self._metric("short_circuited")
+            raise CircuitOpenError(f"LLM {self.name} circuit open; upstream degraded")
+        self._metric("requests")
+        self.budget.deposit()
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = fn(*args)
+                self.breaker.record_success()
+                return result
+            except _RetryableError as e:
+                self.breaker.record_failure()
+                if self.breaker.state == "open":
+                    self._metric("circuit_opened")
+                if attempt == self.max_retries or self.breaker.state == "open":
+                    raise LLMUnavailableError(f"LLM {self.name} failed: {e}")
+                if not self.budget.withdraw():
+                    self._metric("retry_budget_exhausted")
+                    raise LLMUnavailableError(f"LLM {self.name} failed (retry budget exhausted): {e}")
+                self._metric("retries")
+                # full jitter exponential backoff
+                time.sleep(random.uniform(0, min(8.0, 0.5 * 2 ** attempt)))
+            except requests.HTTPError:
+                self.breaker.record_success()   # upstream is healthy, the request was bad
+                raise
+            except Exception:
+                # anything unexpected still settles the breaker (and releases a
+                # half-open probe) before propagating
+                self.breaker.record_failure()
+                raise
+
+    def chat(self, headers: dict, payload: dict) -> dict:
+        """POST a chat-completions payload and return the decoded JSON response."""
+        return self._with_retries(self._hedged, headers, payload)
+
+    def _open_stream(self, headers: dict, payload: dict):
+        try:
+            resp = self.transport(self.url, headers=headers, json=payload, timeout=self.timeout, stream=True)
+        except _TRANSIENT as e:
+            raise _RetryableError(f"{type(e).__name__}: {e}")
+        if resp.status_code == 429 or resp.status_code >= 500:
+            status, text = resp.status_code, resp.text[:200]
+            resp.close()
+            raise _RetryableError(f"HTTP {status}: {text}")
+        resp.raise_for_status()
+        return resp
+
+    def stream(self, headers: dict, payload: dict):
+        """
+        POST with ``"stream": true`` and yield content deltas as they arrive.
+
+        Failures before the response starts are retried like chat(); a
+        failure mid-stream is raised, since the caller has already consumed
+        part of the answer. Streams are never hedged (a duplicate would
+        double the token cost). Closing the generator closes the connection,
+        which stops the upstream from generating further tokens.
+        """
+        resp = self._with_retries(self._open_stream, headers, {**payload, "stream": True})
+        try:
+            for line in resp.iter_lines():
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    return
+                choices = json.loads(data).get("choices") or [{}]
+                delta = (choices[0].get("delta") or {}).get("content")
+                if delta:
+                    yield delta
+        except _TRANSIENT as e:
+            self.breaker.record_failure()
+            self._metric("stream_broken")
+            raise LLMUnavailableError(f"LLM {self.name} stream broken: {e}")
+        finally:
+            resp.close()
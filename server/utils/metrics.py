@@ -0,0 +1,34 @@
+# server/utils/metrics.py
+
+import threading
+from collections import defaultdict
+
+# Process-wide counters and gauges. Kept deliberately tiny: the MCP server
+# exposes a snapshot through the `get_metrics` tool and Flask proxies it.
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_gauges = defaultdict(float)
+
+
+def incr(name: str, value: int = 1) -> None:
+    """Increment a monotonic counter."""
+    with _lock:
+        _counters[name] += value
+
+
+def gauge_add(name: str, delta: float) -> None:
+    """Move a gauge up or down (e.g. current waiters)."""
+    with _lock:
+        _gauges[name] += delta
+
+
+def set_gauge(name: str, value: float) -> None:
+    """Set a gauge to an absolute value."""
+    with _lock:
+        _gauges[name] = value
+
+
+def snapshot() -> dict:
+    """Return a copy of all counters and gauges."""
+    with _lock:
+        return {"counters": dict(_counters), "gauges": dict(_gauges)}
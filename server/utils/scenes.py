@@ -0,0 +1,232 @@
+# server/utils/scenes.py
+
+import re
+import ast
+
+# Single-scene code defines MyScene; longer pieces may define several ordered
+# scenes whose names start with it (MyScene1, MyScene2, ...)
+SCENE_NAME = "MyScene"
+
+_CLASS_RE = re.compile(r"^class\s+(\w+)\s*(?:\(([^)]*)\))?\s*:")
+_MANIM_IMPORT_RE = re.compile(r"^(from\s+manim(\.\w+)*\s+import\b|import\s+manim\b)")
+# First line of a plain Python script; anything else is prose ("Sure! Here's...")
+_CODE_START_RE = re.compile(r"""^(from\s|import\s|#|class\s|def\s|@|\"\"\"|''')""")
+# Top-level statements that are safe places to syntax-check everything above
+_CHECKPOINT_RE = re.compile(r"^(class|def|from|import|async\s+def)\s")
+
+
+class InvalidCodeStream(ValueError):
+    """The (partial) completion can already be rejected."""
+
+
+class SceneStreamValidator:
+    """
+    Incrementally checks a streamed Manim completion, one complete line at
+    a time, and raises InvalidCodeStream as soon as the output is clearly
+    unusable: prose instead of code, a missing manim import, or a syntax
+    error in the statements received so far. Markdown fences are stripped,
+    and ``done`` turns true at the closing fence so the caller can stop
+    reading.
+
+    Scene names and ``construct()`` are checked in finish(), against the
+    scenes find_scenes() would render: until the end it isn't known which
+    Scene subclasses only serve as bases for later ones. A Scene that would
+    be left out of the render is rejected rather than silently dropped.
+    """
+
+    def __init__(self, scene_name: str = SCENE_NAME):
+        self.scene_name = scene_name
+        self.received = 0
+        self.done = False
+        self._pending = ""
+        self._lines = []
+        self._started = False
+        self._fenced = False
+        self._imported = False
+        self._in_string = False
+
+    @property
+    def code(self) -> str:
+        return "\n".join(self._lines)
+
+    def feed(self, delta: str) -> str:
+        """Add streamed text; return the code lines it completed (fences stripped)."""
+        if self.done:
+            return ""
+        self.received += len(delta)
+        self._pending += delta
+        *complete, self._pending = self._pending.split("\n")
+        accepted = []
+        for line in complete:
+            if self._line(line):
+                accepted.append(line + "\n")
+            if self.done:
+                break
+        return "".join(accepted)
+
+    def flush(self) -> str:
+        """Treat any unterminated last line as complete; return it if accepted."""
+        line, self._pending = self._pending, ""
+        if self.done or not line or not self._line(line):
+            return ""
+        return line
+
+    def finish(self) -> str:
+        """Final checks on the whole completion; returns the code."""
+        self.flush()
+        if not self._started:
+            raise InvalidCodeStream("no code in completion")
+        self._compile(self.code)
+        scenes = find_scenes(self.code, self.scene_name)
+        if not scenes:
+            raise InvalidCodeStream(f"no `class {self.scene_name}(Scene)` defined")
+        for name in scenes + skipped_scenes(self.code, self.scene_name):
+            if not name.startswith(self.scene_name):
+                raise InvalidCodeStream(f"scene class is named {name!r}, expected {self.scene_name!r}")
+        for name in scenes:
+            if not _has_construct(self.code, name):
+                raise InvalidCodeStream(f"{name} has no construct() method")
+        return self.code.strip("\n") + "\n"
+
+    def _compile(self, source: str) -> None:
+        try:
+            compile(source, "<generated>", "exec")
+        except SyntaxError as e:
+            raise InvalidCodeStream(f"syntax error on line {e.lineno}: {e.msg}")
+
+    def _line(self, line: str) -> bool:
+        """Validate one complete line; return whether it is part of the code."""
+        stripped = line.strip()
+        if not self._started:
+            if not stripped:
+                return False
+            if stripped.startswith("```") and not self._fenced:
+                self._fenced = True
+                return False
+            if not _CODE_START_RE.match(stripped):
+                raise InvalidCodeStream(f"completion starts with prose: {stripped[:60]!r}")
+            self._started = True
+        elif stripped.startswith("```"):
+            # closing fence: whatever follows is commentary
+            self.done = True
+            return False
+
+        if self._in_string:
+            pass    # inside a multi-line string literal: nothing to check
+        elif line and not line[0].isspace() and stripped and not stripped.startswith("#"):
+            self._top_level(line)
+        if (line.count('"""') + line.count("'''")) % 2:
+            self._in_string = not self._in_string
+        self._lines.append(line)
+        return True
+
+    def _top_level(self, line: str) -> None:
+        if _MANIM_IMPORT_RE.match(line):
+            self._imported = True
+
+        if _CHECKPOINT_RE.match(line) and self._lines:
+            previous = next((l for l in reversed(self._lines) if l.strip()), "")
+            if not previous.startswith("@"):
+                self._compile("\n".join(self._lines))
+
+        if _CLASS_RE.match(line) and not self._imported:
+            raise InvalidCodeStream("class defined before any `from manim import ...`")
+
+
+def _base_name(node) -> str:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return ""
+
+
+def _has_construct(code: str, name: str) -> bool:
+    """Whether class ``name`` defines construct() itself or inherits it from a class in the module."""
+    classes = {node.name: node for node in ast.parse(code).body if isinstance(node, ast.ClassDef)}
+    seen = set()
+    pending = [name]
+    while pending:
+        node = classes.get(pending.pop())
+        if node is None or node.name in seen:
+            continue
+        seen.add(node.name)
+        if any(isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and item.name == "construct"
+               for item in node.body):
+            return True
+        pending.extend(_base_name(b) for b in node.bases)
+    return False
+
+
+def _scene_classes(code: str):
+    """Top-level class nodes by name, and the names of those deriving from a ``*Scene`` base."""
+    classes = {}
+    scenes = []
+    for node in ast.parse(code).body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        classes[node.name] = node
+        if any(b.endswith("Scene") or b in scenes for b in map(_base_name, node.bases)):
+            scenes.append(node.name)
+    return classes, scenes
+
+
+def _ancestors(classes: dict, name: str) -> set:
+    """Names of the module's classes that ``name`` derives from, directly or not."""
+    found = set()
+    pending = [_base_name(b) for b in classes[name].bases]
+    while pending:
+        base = pending.pop()
+        if base in classes and base not in found:
+            found.add(base)
+            pending.extend(_base_name(b) for b in classes[base].bases)
+    return found
+
+
+def find_scenes(code: str, scene_name: str = SCENE_NAME) -> list:
+    """
+    Scene classes to render, in source order: classes deriving from a
+    ``*Scene`` base (directly or through another class in the module).
+    When any are named ``scene_name*``, only those are rendered, including
+    ones other scenes derive from; otherwise classes that only serve as a
+    base for other scenes are skipped.
+    """
+    classes, scenes = _scene_classes(code)
+    named = [name for name in scenes if name.startswith(scene_name)]
+    if named:
+        return named
+    used_as_base = set().union(*(_ancestors(classes, name) for name in scenes))
+    return [name for name in scenes if name not in used_as_base]
+
+
+def skipped_scenes(code: str, scene_name: str = SCENE_NAME) -> list:
+    """Scene classes find_scenes() leaves out although no rendered scene derives from them."""
+    classes, scenes = _scene_classes(code)
+    rendered = find_scenes(code, scene_name)
+    needed = set(rendered).union(*(_ancestors(classes, name) for name in rendered))
+    return [name for name in scenes if name not in needed]
+
+
+def split_scenes(code: str) -> list:
+    """
+    ``(name, source)`` per scene, in order. Each source is the module with
+    the other scenes' classes removed (except those it derives from), i.e.
+    exactly what that scene's render depends on, so editing one scene
+    leaves the others' sources unchanged.
+    """
+    scenes = find_scenes(code)
+    if len(scenes) <= 1:
+        return [(name, code) for name in scenes]
+    classes, _ = _scene_classes(code)
+    lines = code.splitlines(keepends=True)
+    spans = {}
+    for name in scenes:
+        node = classes[name]
+        start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+        spans[name] = range(start, node.end_lineno + 1)
+    out = []
+    for name in scenes:
+        keep = _ancestors(classes, name) | {name}
+        drop = set().union(*(span for other, span in spans.items() if other not in keep))
+        out.append((name, "".join(line for i, line in enumerate(lines, 1) if i not in drop)))
+    return out
@@ -0,0 +1,73 @@
+# server/utils/singleflight.py
+
+import threading
+import logging
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key: the first caller executes,
+    later callers block until it finishes and receive the same result (or
+    the same exception). Nothing is cached once the call completes.
+
+    Metrics (prefixed with ``name``): ``.executions`` and ``.coalesced``
+    counters, ``.in_flight`` and ``.waiters`` gauges.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run ``fn`` for ``key`` or join the in-flight run. Returns (result, shared)."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                metrics.gauge_add(f"{self.name}.in_flight", 1)
+            else:
+                call.waiters += 1
+                metrics.gauge_add(f"{self.name}.waiters", 1)
+
+        if not leader:
+            metrics.incr(f"{self.name}.coalesced")
+            logger.debug("%s: joining in-flight call %s (%d waiters)", self.name, key[:12], call.waiters)
+            try:
+                call.done.wait()
+            finally:
+                metrics.gauge_add(f"{self.name}.waiters", -1)
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        metrics.incr(f"{self.name}.executions")
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+                metrics.gauge_add(f"{self.name}.in_flight", -1)
+            call.done.set()
+
+    def in_flight(self) -> dict:
+        """Current in-flight keys mapped to their waiter counts."""
+        with self._lock:
+            return {key: call.waiters for key, call in self._calls.items()}
@@ -19,5 +19,9 @@ def save_video_path(src_path: str) -> str:
     ext = os.path.splitext(src_path)[1]
     unique_name = f"{uuid.uuid4().hex}{ext}"
     dest_path = os.path.join(VIDEOS_DIR, unique_name)
-    shutil.move(src_path, dest_path)
+    # src may live on another filesystem, so stage next to the destination
+    # and rename: readers never see a partially copied file.
+    staging = os.path.join(VIDEOS_DIR, f".{unique_name}.tmp")
+    shutil.move(src_path, staging)
+    os.replace(staging, dest_path)
     return dest_path